@@ -36,6 +36,12 @@ END
 
 >&2 echo 'PostgreSQL is available'
 
+# metric files of the previous run, the workers of this one start from zero
+if [ -n "${PROMETHEUS_MULTIPROC_DIR:-}" ]; then
+    rm -rf "${PROMETHEUS_MULTIPROC_DIR}"
+    mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+fi
+
 tail -f /var/log/cron.log &
 
 exec "$@"
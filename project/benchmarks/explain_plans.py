@@ -0,0 +1,188 @@
+"""
+Query plan regression check. Creates the schema in a scratch postgres schema, seeds it with
+realistic volumes, runs EXPLAIN for the hot queries of the views and exits with 1 when a plan
+reads a large table with a sequential scan. Everything runs in one transaction that is rolled back.
+
+    python -m benchmarks.explain_plans --users 2000 --days 14
+
+tests/test_query_plans.py runs it with the defaults.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import sys
+from dataclasses import dataclass
+from sqlalchemy import select, desc, text, func, distinct, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import joinedload
+from src.database.database import async_engine, Base
+from src.auth.models import AccountModel, SessionModel, UserInfo, UserGoal
+from src.diet.models import (
+    MenuModel, MenuItemModel, ProductModel, ProductTypes, IngredientModel, IngredientProductModel,
+    DailyNutritionModel, ConductedTrainingModel
+)
+from src.diet.variety import RECENT_DAYS
+
+SCHEMA = 'explain_check'
+# tables with fewer rows are small enough for a sequential scan to be the right plan
+LARGE_TABLE_ROWS = 10_000
+
+
+async def seed(connection: AsyncConnection, users: int, days: int, products: int) -> None:
+    statements = [
+        f"""INSERT INTO accounts (id, username, password, birth_date, gender, is_admin)
+            SELECT i, 'user' || i, 'x', DATE '1990-01-01' + i % 7000, i % 2 = 0, false
+            FROM generate_series(1, {users}) i""",
+        f"""INSERT INTO sessions (user_id, active)
+            SELECT 1 + i % {users}, i % 10 = 0 FROM generate_series(1, {users * 5}) i""",
+        f"""INSERT INTO user_info (user_id, weight, height, created_at)
+            SELECT 1 + i % {users}, 70, 175, now() - (i / {users}) * interval '1 day'
+            FROM generate_series(1, {users * days}) i""",
+        f"""INSERT INTO user_goal (user_id, goal, created_at)
+            SELECT i, 'loss', now() FROM generate_series(1, {users}) i""",
+        f"""INSERT INTO ingredients (id, name, calories_per_unit, allergic_index, allergic_percentage)
+            SELECT i, 'ingredient' || i, 10, 'LOW', 0 FROM generate_series(1, {products // 10}) i""",
+        f"""INSERT INTO products (id, name, image, type, price, calories)
+            SELECT i, 'product' || i, 'images/' || i, (ARRAY{[t.name for t in ProductTypes]}::producttypes[])[1 + i % {len(ProductTypes)}],
+                   i % 50, 100 + i % 700
+            FROM generate_series(1, {products}) i""",
+        f"""INSERT INTO ingredient_products (product_id, ingredient_id)
+            SELECT 1 + i % {products}, 1 + i % {products // 10} FROM generate_series(1, {products * 5}) i""",
+        f"""INSERT INTO menus (id, user_id, date, meal_time)
+            SELECT i, 1 + i % {users}, current_date - (i / ({users} * 6)),
+                   (ARRAY['BREAKFAST', 'SNACK', 'LUNCH', 'L_LUNCH', 'AFTERNOON', 'DINNER']::mealtimes[])[1 + (i / {users}) % 6]
+            FROM generate_series(1, {users * days * 6}) i""",
+        f"""INSERT INTO menu_items (menu_id, product_id)
+            SELECT 1 + i % {users * days * 6}, 1 + i % {products} FROM generate_series(1, {users * days * 6 * 4}) i""",
+        f"""INSERT INTO daily_nutrition (user_id, date, calories, price, items)
+            SELECT 1 + i % {users}, current_date - i / {users}, 2000, 100, 24 FROM generate_series(0, {users * days - 1}) i""",
+    ]
+    for statement in statements:
+        await connection.execute(text(statement))
+    await connection.execute(text('ANALYZE'))
+
+
+@dataclass
+class Sample:
+    """
+    Ids of seeded rows that belong together, the way one request sees them
+    """
+    user_id: int
+    session_id: int
+    product_id: int
+    ingredient_id: int
+    menu_ids: list[int]
+
+
+async def sample(connection: AsyncConnection, user_id: int, product_id: int) -> Sample:
+    async def ids(statement: str, **params) -> list[int]:
+        return list((await connection.execute(text(statement), params)).scalars())
+
+    return Sample(
+        user_id=user_id,
+        session_id=(await ids('SELECT id FROM sessions WHERE user_id = :user_id LIMIT 1', user_id=user_id))[0],
+        product_id=product_id,
+        ingredient_id=(await ids(
+            'SELECT ingredient_id FROM ingredient_products WHERE product_id = :product_id LIMIT 1', product_id=product_id
+        ))[0],
+        menu_ids=await ids('SELECT id FROM menus WHERE user_id = :user_id ORDER BY id', user_id=user_id),
+    )
+
+
+def hot_queries(ids: Sample) -> dict:
+    today = datetime.date.today()
+    user_id = ids.user_id
+    count = func.count(distinct(MenuItemModel.id))
+    recent = datetime.timedelta(days=RECENT_DAYS - 1)
+    return {
+        'get_current_user': select(SessionModel).where(SessionModel.id == ids.session_id)
+        .options(joinedload(SessionModel.user)),
+        'sessions of user': select(SessionModel.id).where(SessionModel.user_id == user_id),
+        '/account/info': select(AccountModel, UserInfo).join(UserInfo, UserInfo.user_id == AccountModel.id)
+        .where(AccountModel.id == user_id),
+        '/account/info/progress latest': select(UserInfo).where(UserInfo.user_id == user_id)
+        .order_by(desc(UserInfo.created_at)).limit(1),
+        '/account/info/progress week old': select(UserInfo).where(
+            UserInfo.user_id == user_id, UserInfo.created_at <= today - datetime.timedelta(days=7)
+        ).order_by(desc(UserInfo.created_at)).limit(1),
+        '/account/goal': select(UserGoal).where(UserGoal.user_id == user_id),
+        '/diet/products/{id}': select(ProductModel).where(ProductModel.id == ids.product_id),
+        '/diet/menu': select(MenuModel).where(MenuModel.user_id == user_id),
+        '/diet/menu items (selectin)': select(MenuItemModel).where(MenuItemModel.menu_id.in_(ids.menu_ids)),
+        '/diet/menu/{id}/swap/{product_id}': select(MenuItemModel.product_id)
+        .join(MenuModel, MenuModel.id == MenuItemModel.menu_id)
+        .where(MenuModel.id == ids.menu_ids[0], MenuModel.user_id == user_id),
+        '/diet/shopping-list': select(ProductModel.id, IngredientModel.id, count)
+        .select_from(MenuModel)
+        .join(MenuItemModel, MenuItemModel.menu_id == MenuModel.id)
+        .join(ProductModel, ProductModel.id == MenuItemModel.product_id)
+        .outerjoin(IngredientProductModel, IngredientProductModel.product_id == ProductModel.id)
+        .outerjoin(IngredientModel, IngredientModel.id == IngredientProductModel.ingredient_id)
+        .where(MenuModel.user_id == user_id, MenuModel.date.between(today - datetime.timedelta(days=6), today))
+        .group_by(func.grouping_sets(tuple_(ProductModel.id), tuple_(IngredientModel.id))),
+        '/diet/nutrition': select(DailyNutritionModel)
+        .where(DailyNutritionModel.user_id == user_id,
+               DailyNutritionModel.date.between(today - datetime.timedelta(days=30), today)),
+        'recent products': select(MenuItemModel.product_id).distinct()
+        .join(MenuModel, MenuItemModel.menu_id == MenuModel.id)
+        .where(MenuModel.user_id == user_id, MenuModel.date.between(today - recent, today + recent)),
+        'ingredients of products (selectin)': select(IngredientProductModel)
+        .where(IngredientProductModel.product_id.in_([ids.product_id])),
+        'products using an ingredient': select(IngredientProductModel.product_id)
+        .where(IngredientProductModel.ingredient_id == ids.ingredient_id),
+        'trainings of user': select(ConductedTrainingModel).where(ConductedTrainingModel.user_id == user_id),
+    }
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = [plan['Relation Name']] if plan['Node Type'] == 'Seq Scan' else []
+    for child in plan.get('Plans', []):
+        found += seq_scans(child)
+    return found
+
+
+async def check(users: int, days: int, products: int) -> int:
+    failures = 0
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await connection.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+            await connection.execute(text(f'SET LOCAL search_path TO {SCHEMA}'))
+            await connection.run_sync(Base.metadata.create_all)
+            await seed(connection, users, days, products)
+            sizes = dict((await connection.execute(text(
+                "SELECT relname, reltuples FROM pg_class WHERE relnamespace = CAST(:schema AS regnamespace)"
+            ), {'schema': SCHEMA})).all())
+
+            ids = await sample(connection, users // 2, products // 2)
+            for name, query in hot_queries(ids).items():
+                sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+                plan = (await connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}'))).scalar()
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+                large = [table for table in seq_scans(plan) if sizes.get(table, 0) >= LARGE_TABLE_ROWS]
+                if large:
+                    failures += 1
+                print(f"{'FAIL' if large else 'ok':4} {name:40} cost={plan['Total Cost']:<10} "
+                      f"{'seq scan on ' + ', '.join(large) if large else ''}")
+        finally:
+            await transaction.rollback()
+    await async_engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=14)
+    # above LARGE_TABLE_ROWS, a sequential scan on products is reported
+    parser.add_argument('--products', type=int, default=2 * LARGE_TABLE_ROWS)
+    args = parser.parse_args()
+    failures = asyncio.run(check(args.users, args.days, args.products))
+    print(f"{failures} plan(s) with sequential scans on large tables")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
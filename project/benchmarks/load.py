@@ -0,0 +1,271 @@
+"""
+Load test of the user journeys against the configured database. Seeds accounts (measurements, goals, menus),
+products and ingredients under a run prefix, drives the app with concurrent clients for a while and prints
+throughput and p50/p95/p99 per endpoint as JSON. The seeded rows are deleted at the end.
+
+    python -m benchmarks.load --users 200 --clients 50 --duration 30 --output before.json
+    python -m benchmarks.load --url http://127.0.0.1:8000    # a running server instead of the app in-process
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+import httpx
+import numpy
+from sqlalchemy import text
+from main import app
+from src.auth.manager import UserManager
+from src.cache import cache
+from src.database.database import async_engine
+from src.database.migrate import migrate
+from src.diet.catalog import catalog
+from src.diet.models import ProductTypes
+from src.diet.views import PRODUCTS_TAG, INGREDIENTS_TAG
+
+PASSWORD = 'load'
+MEAL_TIMES = ('BREAKFAST', 'LUNCH', 'DINNER')
+
+
+async def seed(prefix: str, users: int, products: int, ingredients: int, days: int) -> None:
+    password = UserManager.get_password_hash(PASSWORD)
+    menus = users * days * len(MEAL_TIMES)
+    statements = [
+        f"""INSERT INTO accounts (username, password, birth_date, gender, is_admin)
+            SELECT '{prefix}' || i, '{password}', DATE '1970-01-01' + i % 12000, i % 2 = 0, false
+            FROM generate_series(1, {users}) i""",
+        # two measurements older than a week: progress has data and a new measurement is allowed
+        f"""INSERT INTO user_info (user_id, weight, height, created_at)
+            SELECT a.id, 60 + a.id % 40 + w, 150 + a.id % 50, now() - w * interval '7 days' - interval '1 day'
+            FROM accounts a, generate_series(1, 2) w WHERE a.username LIKE '{prefix}%'""",
+        f"""INSERT INTO user_goal (user_id, goal, created_at)
+            SELECT id, 'maintain', now() FROM accounts WHERE username LIKE '{prefix}%'""",
+        f"""INSERT INTO ingredients (name, calories_per_unit, allergic_index, allergic_percentage)
+            SELECT '{prefix}i' || i, 1 + i % 100, 'LOW', i % 100 FROM generate_series(1, {ingredients}) i""",
+        f"""INSERT INTO products (name, description, image, type, price, calories)
+            SELECT '{prefix}p' || i, 'load test product', 'load/{prefix}' || i || '.png',
+                   (ARRAY{[t.name for t in ProductTypes]}::producttypes[])[1 + i % {len(ProductTypes)}],
+                   1 + i % 50, 50 + i % 700
+            FROM generate_series(1, {products}) i""",
+        f"""INSERT INTO ingredient_products (product_id, ingredient_id)
+            SELECT p.id, i.id FROM
+                (SELECT id, row_number() OVER (ORDER BY id) n FROM products WHERE name LIKE '{prefix}%') p
+                JOIN (SELECT id, row_number() OVER (ORDER BY id) n FROM ingredients WHERE name LIKE '{prefix}%') i
+                ON (p.n * 7 + i.n) % {ingredients} < 5""",
+        f"""INSERT INTO menus (user_id, date, meal_time)
+            SELECT a.id, current_date - d, m::mealtimes
+            FROM accounts a, generate_series(0, {days - 1}) d, unnest(ARRAY{list(MEAL_TIMES)}) m
+            WHERE a.username LIKE '{prefix}%'""",
+        f"""INSERT INTO menu_items (menu_id, product_id)
+            SELECT m.id, p.id FROM
+                (SELECT m.id, row_number() OVER (ORDER BY m.id) n FROM menus m
+                 JOIN accounts a ON a.id = m.user_id WHERE a.username LIKE '{prefix}%') m
+                JOIN (SELECT id, row_number() OVER (ORDER BY id) n FROM products WHERE name LIKE '{prefix}%') p
+                ON (m.n * 13 + p.n) % {products} < 4""",
+    ]
+    async with async_engine.begin() as connection:
+        for statement in statements:
+            await connection.execute(text(statement))
+        await connection.execute(text('ANALYZE'))
+    await cache.invalidate_tags(PRODUCTS_TAG, INGREDIENTS_TAG)
+    await catalog.invalidate()
+    print(f"seeded {users} accounts, {menus} menus, {products} products, {ingredients} ingredients", file=sys.stderr)
+
+
+async def cleanup(prefix: str) -> None:
+    async with async_engine.begin() as connection:
+        # sessions, measurements, goals, menus and jobs go with the accounts
+        await connection.execute(text(f"DELETE FROM accounts WHERE username LIKE '{prefix}%'"))
+        await connection.execute(text(f"DELETE FROM products WHERE name LIKE '{prefix}%'"))
+        await connection.execute(text(f"DELETE FROM ingredients WHERE name LIKE '{prefix}%'"))
+    await cache.invalidate_tags(PRODUCTS_TAG, INGREDIENTS_TAG)
+    await catalog.invalidate()
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, Counter] = defaultdict(Counter)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        :param name: endpoint the sample is reported under, the route template
+        """
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as err:
+            self.latencies[name].append(time.perf_counter() - started)
+            self.errors[name][type(err).__name__] += 1
+            raise
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name][response.status_code] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            p50, p95, p99 = numpy.percentile(samples, [50, 95, 99]) * 1000
+            endpoints[name] = {
+                'requests': len(samples),
+                'rps': round(len(samples) / elapsed, 2),
+                'errors': dict(self.errors[name]),
+                'p50_ms': round(p50, 2),
+                'p95_ms': round(p95, 2),
+                'p99_ms': round(p99, 2),
+                'max_ms': round(max(samples) * 1000, 2),
+            }
+        requests = sum(len(samples) for samples in self.latencies.values())
+        return {
+            'requests': requests,
+            'errors': sum(sum(errors.values()) for errors in self.errors.values()),
+            'throughput_rps': round(requests / elapsed, 2),
+            'endpoints': endpoints,
+        }
+
+
+class VirtualUser:
+    """
+    One client of the mobile app: logs in, then runs weighted journeys until the deadline
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, username: str, prefix: str, rnd: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.username = username
+        self.prefix = prefix
+        self.rnd = rnd
+        self.access_token = ''
+        self.refresh_token = ''
+
+    @property
+    def headers(self) -> dict:
+        return {'Authorization': f'Bearer {self.access_token}'}
+
+    async def login(self) -> None:
+        response = await self.recorder.call(
+            self.client, 'POST /account/token', 'POST', '/account/token',
+            data={'username': self.username, 'password': PASSWORD},
+        )
+        tokens = response.json()
+        self.access_token, self.refresh_token = tokens['access_token'], tokens['refresh_token']
+
+    async def refresh(self) -> None:
+        response = await self.recorder.call(
+            self.client, 'POST /account/refresh', 'POST', '/account/refresh',
+            headers={'Authorization': f'Bearer {self.refresh_token}'},
+        )
+        if response.status_code == 200:
+            self.access_token = response.json()['access_token']
+
+    async def startup(self) -> None:
+        """
+        What the app fetches when it is opened
+        """
+        for path in ('/account/', '/account/info', '/account/goal', '/account/info/progress', '/diet/menu'):
+            await self.recorder.call(self.client, f'GET {path}', 'GET', path, headers=self.headers)
+
+    async def browse(self) -> None:
+        for path in ('/diet/products', '/diet/ingredients'):
+            await self.recorder.call(self.client, f'GET {path}', 'GET', path, headers=self.headers)
+
+    async def measure(self) -> None:
+        await self.recorder.call(
+            self.client, 'POST /account/info', 'POST', '/account/info', headers=self.headers,
+            json={'weight': self.rnd.uniform(50, 110), 'height': self.rnd.uniform(150, 200)},
+        )
+
+    async def register(self) -> None:
+        username = f'{self.prefix}n{uuid.uuid4().hex[:12]}'
+        await self.recorder.call(
+            self.client, 'POST /account/register', 'POST', '/account/register',
+            json={
+                'users': {'weight': self.rnd.uniform(50, 110), 'height': self.rnd.uniform(150, 200)},
+                'data': {'username': username, 'password': PASSWORD, 'birth_date': '1995-06-01', 'gender': True},
+            },
+        )
+
+    async def run(self, deadline: float, think: float) -> None:
+        journeys = {self.startup: 10, self.browse: 4, self.refresh: 2, self.login: 1, self.register: 1}
+        await self.login()
+        # measurements are accepted once a week, every user posts one
+        await self.measure()
+        while time.monotonic() < deadline:
+            journey, = self.rnd.choices(list(journeys), weights=list(journeys.values()))
+            try:
+                await journey()
+            except httpx.HTTPError:
+                pass
+            if think:
+                await asyncio.sleep(self.rnd.expovariate(1 / think))
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=200, help='seeded accounts')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--ingredients', type=int, default=200)
+    parser.add_argument('--days', type=int, default=7, help='days of menus per account')
+    parser.add_argument('--clients', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=20, help='seconds')
+    parser.add_argument('--think', type=float, default=0, help='mean seconds between journeys of a client')
+    parser.add_argument('--url', help='base url of a running server, the app runs in-process without it')
+    parser.add_argument('--output', help='file the JSON report is written to as well')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    prefix = f'load{uuid.uuid4().hex[:8]}_'
+    rnd = random.Random(args.seed)
+    if args.url:
+        client = httpx.AsyncClient(
+            base_url=args.url, timeout=60, limits=httpx.Limits(max_connections=args.clients)
+        )
+    else:
+        await migrate()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://load', timeout=60)
+    await seed(prefix, args.users, args.products, args.ingredients, args.days)
+    recorder = Recorder()
+    try:
+        async with client:
+            users = [
+                VirtualUser(client, recorder, f'{prefix}{1 + i % args.users}', prefix, random.Random(rnd.random()))
+                for i in range(args.clients)
+            ]
+            started = time.monotonic()
+            await asyncio.gather(*(user.run(started + args.duration, args.think) for user in users))
+            elapsed = time.monotonic() - started
+    finally:
+        await cleanup(prefix)
+        await async_engine.dispose()
+
+    report = {
+        'commit': commit(),
+        'target': args.url or 'in-process',
+        'clients': args.clients,
+        'users': args.users,
+        'duration_s': round(elapsed, 2),
+        **recorder.report(elapsed),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,278 @@
+"""
+Micro-benchmarks of the hot functions at several data sizes with fixed-seed fixtures. The database ones run
+in a scratch postgres schema inside one transaction that is rolled back. Medians are compared with the
+stored baseline and the run exits with 1 when one got slower by more than --threshold percent.
+
+    python -m benchmarks.micro --save           # store the baseline, e.g. on the main branch
+    python -m benchmarks.micro                  # compare a change against it
+    python -m benchmarks.micro -k generate_menu --rounds 15
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import importlib
+import json
+import pathlib
+import platform
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from benchmarks.load import commit
+from benchmarks.serialization import build_rows
+from settings import settings
+from src.auth.models import AccountModel
+from src.cache import cache, MemoryBackend
+from src.database.database import async_engine, Base
+from src.diet.catalog import catalog
+from src.diet.menu import generate_menu
+from src.diet.models import MenuModel, MenuItemModel, MealTimes, ProductTypes
+from src.diet.schemas import MenuSchema, ProductOutSchema
+from src.responses import SchemaResponse
+
+SCHEMA = 'micro_bench'
+BASELINE = pathlib.Path('.benchmarks/micro.json')
+
+
+@dataclass
+class Benchmark:
+    name: str
+    sizes: tuple
+    # builds the fixture of one size, returns the call that is timed
+    setup: Callable[['Fixtures', Any], Awaitable[Callable[[], Any]]]
+
+
+benchmarks: list[Benchmark] = []
+
+
+def benchmark(name: str, *sizes):
+    def decorator(setup):
+        benchmarks.append(Benchmark(name, sizes or (None,), setup))
+        return setup
+
+    return decorator
+
+
+class Fixtures:
+    """
+    Scratch schema on one connection. Sessions of the benchmarks join its transaction,
+    their commits only release savepoints.
+    """
+
+    def __init__(self, connection: AsyncConnection, seed: int) -> None:
+        self.connection = connection
+        self.rnd = random.Random(seed)
+        self.session = AsyncSession(bind=connection, join_transaction_mode='create_savepoint', expire_on_commit=False)
+        self.account: AccountModel | None = None
+        self.sessions = 0
+        self.products = 0
+
+    async def user(self) -> AccountModel:
+        if self.account is None:
+            self.account = AccountModel(
+                username='bench', password='x', birth_date=datetime.date(1990, 1, 1), gender=True, is_admin=False
+            )
+            self.session.add(self.account)
+            await self.session.commit()
+        return self.account
+
+    async def grow_sessions(self, rows: int) -> None:
+        user = await self.user()
+        if rows > self.sessions:
+            await self.session.execute(text(
+                f"INSERT INTO sessions (user_id, active) SELECT {user.id}, true FROM generate_series(1, {rows - self.sessions})"
+            ))
+            self.sessions = rows
+
+    async def grow_products(self, rows: int) -> None:
+        if rows > self.products:
+            types = [t.name for t in ProductTypes]
+            await self.session.execute(text(
+                f"""INSERT INTO products (name, image, type, price, calories)
+                    SELECT 'product' || i, 'images/' || i, (ARRAY{types}::producttypes[])[1 + i % {len(types)}],
+                           1 + i % 50, 50 + (i * 7919) % 500
+                    FROM generate_series({self.products + 1}, {rows}) i"""
+            ))
+            self.products = rows
+        await catalog.invalidate()
+
+    async def token(self) -> str:
+        user = await self.user()
+        token, _ = await user.create_access_token(self.session, {'username': user.username})
+        return token
+
+
+def request() -> Request:
+    return Request({'type': 'http', 'headers': [], 'state': {}})
+
+
+@benchmark('verify_user')
+async def bench_verify_user(fixtures: Fixtures, size):
+    token = await fixtures.token()
+    return lambda: AccountModel.verify_user(token)
+
+
+@benchmark('get_current_user', 1_000, 100_000)
+async def bench_get_current_user(fixtures: Fixtures, sessions: int):
+    await fixtures.grow_sessions(sessions)
+    token = await fixtures.token()
+    return lambda: AccountModel.get_current_user(request(), token, fixtures.session)
+
+
+@benchmark('create_access_token', 1_000, 100_000)
+async def bench_create_access_token(fixtures: Fixtures, sessions: int):
+    await fixtures.grow_sessions(sessions)
+    user = await fixtures.user()
+    return lambda: user.create_access_token(fixtures.session, {'username': user.username})
+
+
+@benchmark('generate_menu', 100, 1_000, 10_000)
+async def bench_generate_menu(fixtures: Fixtures, products: int):
+    await fixtures.grow_products(products)
+    user = await fixtures.user()
+    types_amount = {ProductTypes.FOOD: 1, ProductTypes.FRUIT: 2, ProductTypes.DAIRY: 1}
+    dates = (datetime.date(2030, 1, 1) + datetime.timedelta(days=i) for i in range(10 ** 6))
+    # loads the catalog
+    await generate_menu(user, MealTimes.LUNCH, next(dates), (0, 10 ** 6), types_amount, fixtures.session)
+    return lambda: generate_menu(user, MealTimes.LUNCH, next(dates), (0, 10 ** 6), types_amount, fixtures.session)
+
+
+@benchmark('products_schema', 100, 1_000, 5_000)
+async def bench_products_schema(fixtures: Fixtures, products: int):
+    rows = build_rows(products, 5)
+    return lambda: SchemaResponse(list[ProductOutSchema], rows).body
+
+
+@benchmark('menu_schema', 10, 100, 1_000)
+async def bench_menu_schema(fixtures: Fixtures, menus: int):
+    products = build_rows(200, 5)
+    rnd = fixtures.rnd
+    rows = [
+        MenuModel(
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i // 3), meal_time=rnd.choice(list(MealTimes)),
+            items=[MenuItemModel(product=product) for product in rnd.sample(products, 4)],
+        )
+        for i in range(menus)
+    ]
+    return lambda: SchemaResponse(list[MenuSchema], rows).body
+
+
+async def measure(call: Callable[[], Any], rounds: int, min_time: float) -> list[float]:
+    """
+    :return: seconds per call of every round, a round repeats call until it took min_time
+    """
+
+    async def once():
+        result = call()
+        if asyncio.iscoroutine(result):
+            await result
+
+    await once()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            await once()
+        if time.perf_counter() - started >= min_time / 4 or loops >= 10 ** 6:
+            break
+        loops *= 2
+    timings = []
+    gc.disable()
+    try:
+        while len(timings) < rounds:
+            started = time.perf_counter()
+            count = 0
+            while count < loops or time.perf_counter() - started < min_time:
+                await once()
+                count += 1
+            timings.append((time.perf_counter() - started) / count)
+    finally:
+        gc.enable()
+    return timings
+
+
+def isolate() -> None:
+    """
+    Process local cache and event broker: the scratch catalog and menus must not reach
+    the workers that share redis with this run
+    """
+    cache.backend = MemoryBackend(settings.cache.max_entries)
+    # src.events exports the broker instance under the module's name
+    events = importlib.import_module('src.events.broker')
+    events.broker = events.MemoryBroker(settings.events.queue_size)
+
+
+async def run(selected: list[Benchmark], rounds: int, min_time: float, seed: int) -> dict[str, dict]:
+    isolate()
+    results = {}
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await connection.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+            await connection.execute(text(f'SET LOCAL search_path TO {SCHEMA}'))
+            await connection.run_sync(Base.metadata.create_all)
+            fixtures = Fixtures(connection, seed)
+            for bench in selected:
+                for size in bench.sizes:
+                    name = bench.name + ('' if size is None else f'[{size}]')
+                    timings = await measure(await bench.setup(fixtures, size), rounds, min_time)
+                    results[name] = {'median': statistics.median(timings), 'min': min(timings)}
+                    print(f"{name:32} {results[name]['median'] * 1e6:12.1f} us", file=sys.stderr)
+        finally:
+            await transaction.rollback()
+    await async_engine.dispose()
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> int:
+    regressions = 0
+    print(f"{'benchmark':32} {'median us':>12} {'min us':>12} {'baseline us':>12} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        change = '' if base is None else f"{(result['median'] / base['median'] - 1) * 100:+7.1f}%"
+        slower = base is not None and result['median'] > base['median'] * (1 + threshold / 100)
+        regressions += slower
+        print(f"{name:32} {result['median'] * 1e6:12.1f} {result['min'] * 1e6:12.1f} "
+              f"{'' if base is None else format(base['median'] * 1e6, '12.1f'):>12} {change:>8}"
+              f"{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', dest='keyword', help='only benchmarks whose name contains this')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per round')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', type=pathlib.Path, default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=15, help='percent a median may grow by')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    args = parser.parse_args()
+
+    selected = [bench for bench in benchmarks if not args.keyword or args.keyword in bench.name]
+    results = await run(selected, args.rounds, args.min_time, args.seed)
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = compare(results, stored.get('results', {}), args.threshold)
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            'commit': commit(),
+            'python': platform.python_version(),
+            'machine': platform.node(),
+            # -k runs update their benchmarks only
+            'results': {**stored.get('results', {}), **results},
+        }, indent=2))
+        print(f"baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} benchmark(s) slower than the baseline by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Statements and commits sent to postgres by the write paths, against the configured database.
+
+    python -m benchmarks.round_trips
+"""
+import asyncio
+import datetime
+import uuid
+import httpx
+from sqlalchemy import event, text, select
+from main import app
+from src.database.database import async_engine, async_session_maker
+from src.auth.models import AccountModel
+from src.diet.models import ProductModel, ProductTypes, MealTimes
+from src.diet.menu import generate_menu
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.statements = 0
+        self.commits = 0
+        event.listen(async_engine.sync_engine, 'before_cursor_execute', self._statement)
+        event.listen(async_engine.sync_engine, 'commit', self._commit)
+
+    def _statement(self, *args) -> None:
+        self.statements += 1
+
+    def _commit(self, *args) -> None:
+        self.commits += 1
+
+    async def measure(self, name: str, coroutine) -> None:
+        statements, commits = self.statements, self.commits
+        await coroutine
+        print(f"{name:28} {self.statements - statements:3} statements {self.commits - commits:3} commits")
+
+
+async def main():
+    counter = Counter()
+    username = f"rt{uuid.uuid4().hex[:12]}"
+    account = {'username': username, 'password': 'pw', 'birth_date': '1990-01-01', 'gender': True}
+    info = {'weight': 70, 'height': 175}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def register():
+            response = await client.post('/account/register', json={'users': info, 'data': account})
+            assert response.status_code == 200, response.text
+
+        await counter.measure('POST /account/register', register())
+        token = (await client.post('/account/token', data={'username': username, 'password': 'pw'})).json()
+        headers = {'Authorization': f"Bearer {token['access_token']}"}
+
+        async with async_session_maker() as session:
+            user = (await session.execute(select(AccountModel).where(AccountModel.username == username))).scalar_one()
+            product_id = (await session.execute(select(ProductModel.id).limit(1))).scalar()
+            await session.execute(
+                text("UPDATE user_info SET created_at = created_at - interval '8 days' WHERE user_id = :id"),
+                {'id': user.id}
+            )
+            await session.commit()
+
+        async def post_info():
+            response = await client.post('/account/info', json=info, headers=headers)
+            assert response.status_code == 200, response.text
+
+        async def add_ingredients():
+            ingredients = [
+                {'name': f"{username}-{i}", 'calories_per_unit': 1, 'allergic_index': 'l', 'allergic_percentage': 0}
+                for i in range(3)
+            ]
+            response = await client.post(f'/diet/products/{product_id}', json=ingredients, headers=headers)
+            assert response.status_code == 200, response.text
+
+        await counter.measure('POST /account/info', post_info())
+        await counter.measure('POST /diet/products/{id}', add_ingredients())
+
+    types_amount = {ProductTypes.FOOD: 1, ProductTypes.FRUIT: 2, ProductTypes.DAIRY: 1}
+
+    async def menu(date):
+        async with async_session_maker() as session:
+            await generate_menu(user, MealTimes.LUNCH, date, (0, 10 ** 6), types_amount, session)
+
+    # loads the catalog and the recent products of the user
+    await menu(datetime.date.today())
+    await counter.measure('generate_menu', menu(datetime.date.today() + datetime.timedelta(days=1)))
+    await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+GET /diet/products body for in-memory ORM rows: the old hand built schemas + response_model path
+against SchemaResponse.
+
+    python -m benchmarks.serialization --products 5000 --ingredients 5
+"""
+import argparse
+import asyncio
+import gc
+import random
+import time
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from src.diet.models import ProductModel, ProductTypes, IngredientModel, IngredientProductModel, AllergicIndexes
+from src.diet.schemas import ProductOutSchema, IngredientSchema
+from src.responses import SchemaResponse
+
+
+def build_rows(products: int, ingredients: int) -> list[ProductModel]:
+    rnd = random.Random(42)
+    pool = [
+        IngredientModel(
+            name=f"ingredient {i}", calories_per_unit=rnd.randint(1, 100),
+            allergic_index=rnd.choice(list(AllergicIndexes)), allergic_percentage=rnd.randint(0, 100),
+        )
+        for i in range(500)
+    ]
+    return [
+        ProductModel(
+            name=f"product {i}", description="description " * 4, type=rnd.choice(list(ProductTypes)),
+            calories=rnd.randint(50, 900), price=rnd.randint(1, 50), image=f"http://localhost/media/images/{i}.png",
+            ingredients=[IngredientProductModel(ingredient=ingredient) for ingredient in rnd.sample(pool, ingredients)],
+        )
+        for i in range(products)
+    ]
+
+
+async def old_path(rows: list[ProductModel], field) -> bytes:
+    content = [ProductOutSchema(
+        name=p.name, description=p.description, price=p.price,
+        calories=p.calories, type=p.type.value, image=p.image,
+        ingredients=map(
+            lambda x: IngredientSchema(
+                name=x.ingredient.name,
+                calories_per_unit=x.ingredient.calories_per_unit,
+                allergic_index=x.ingredient.allergic_index,
+                allergic_percentage=x.ingredient.allergic_percentage
+            ), p.ingredients
+        )) for p in rows]
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def new_path(rows: list[ProductModel], field) -> bytes:
+    return SchemaResponse(list[ProductOutSchema], rows).body
+
+
+async def measure(name: str, path, rows, field, repeat: int) -> bytes:
+    body = await path(rows, field)
+    timings = []
+    # like timeit: best of repeat with the collector off, the row graph makes gc pauses dominate otherwise
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            began = time.perf_counter()
+            await path(rows, field)
+            timings.append(time.perf_counter() - began)
+    finally:
+        gc.enable()
+    print(f"{name:16} {min(timings) * 1000:8.1f} ms {len(body) / 1024:8.0f} KiB")
+    return body
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--ingredients', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = build_rows(args.products, args.ingredients)
+    field = create_model_field(name='response', type_=list[ProductOutSchema], mode='serialization')
+    old = await measure('response_model', old_path, rows, field, args.repeat)
+    new = await measure('SchemaResponse', new_path, rows, field, args.repeat)
+    assert orjson.loads(old) == orjson.loads(new), 'bodies differ'
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
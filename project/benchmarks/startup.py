@@ -0,0 +1,112 @@
+"""
+Cold start of a worker: `import main` in fresh interpreters with -X importtime. Prints the median import and
+process times and the packages that cost the most, and exits with 1 when the median import of main is over
+the budget or imported one of DEFERRED_MODULES. Every uvicorn worker and every --reload pays it, keep heavy
+optional packages imported where they are used. tests/test_startup.py checks the same.
+
+    python -m benchmarks.startup                  # checks the budget
+    python -m benchmarks.startup --runs 10 --top 25 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from benchmarks.load import commit
+from settings import settings
+
+# ms for `import main` including mapper configuration, the documented cold start target:
+# about 445 ms after the heavy imports were deferred, plus a margin for noise
+BUDGET_MS = 470
+# imported where they are first used, importing main must not load them
+DEFERRED_MODULES = ('aiofiles', 'numpy', 'passlib', 'uvicorn')
+
+
+def environment() -> dict[str, str]:
+    # reads .env like a fresh process, not the environment this one loaded
+    return {key: value for key, value in os.environ.items() if key != 'DOTENV_LOADED'}
+
+
+def deferred_imports() -> list[str]:
+    """
+    :return: DEFERRED_MODULES that a fresh `import main` loads
+    """
+    process = subprocess.run(
+        [sys.executable, '-c', f'import sys, main; print(*(m for m in {DEFERRED_MODULES!r} if m in sys.modules))'],
+        cwd=settings.base_dir, capture_output=True, text=True, env=environment(), check=True,
+    )
+    return process.stdout.split()
+
+
+def import_once() -> tuple[float, dict[str, float], float]:
+    """
+    :return: ms of importing main, self ms per top level package, ms of the whole process
+    """
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=settings.base_dir, capture_output=True, text=True, env=environment(),
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if process.returncode:
+        sys.exit(process.stderr)
+    packages: dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(own) / 1000
+        if name.strip() == 'main':
+            total = int(cumulative) / 1000
+    return total, packages, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='packages listed')
+    parser.add_argument('--budget', type=float, default=BUDGET_MS, help='ms the median import of main may take')
+    parser.add_argument('--output', help='file the JSON report is written to as well')
+    args = parser.parse_args()
+
+    # writes the bytecode and warms the page cache
+    import_once()
+    runs = [import_once() for _ in range(args.runs)]
+    imports = statistics.median(total for total, _, _ in runs)
+    processes = statistics.median(elapsed for _, _, elapsed in runs)
+    packages = {
+        name: statistics.median(packages.get(name, 0) for _, packages, _ in runs)
+        for name in runs[0][1]
+    }
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(f"{'package':32} {'self ms':>10}", file=sys.stderr)
+    for name, ms in top:
+        print(f"{name:32} {ms:10.1f}", file=sys.stderr)
+    print(f"import main {imports:.1f} ms, process {processes:.1f} ms, budget {args.budget:.0f} ms", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'commit': commit(),
+                'python': sys.version.split()[0],
+                'import_ms': round(imports, 1),
+                'process_ms': round(processes, 1),
+                'packages': {name: round(ms, 1) for name, ms in top},
+            }, file, indent=2)
+    failed = False
+    if imports > args.budget:
+        print(f"import main takes {imports:.1f} ms, over the budget of {args.budget:.0f} ms", file=sys.stderr)
+        failed = True
+    if loaded := deferred_imports():
+        print(f"import main loads {', '.join(loaded)}, import them where they are used", file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
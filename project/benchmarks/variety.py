@@ -0,0 +1,33 @@
+"""
+Cost of picking the products of a menu against the recent products of a user.
+
+    python -m benchmarks.variety --catalog 2000 --amount 4 --menus 100000
+"""
+import argparse
+import random
+import time
+from src.diet.variety import sample_indexes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--catalog', type=int, default=2000)
+    parser.add_argument('--amount', type=int, default=4)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--menus', type=int, default=100_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    ids = list(range(1, args.catalog + 1))
+    # what recent_products returns for a user with a menu on each of the days
+    recent = set(rnd.sample(ids, min(args.days * args.amount, args.catalog)))
+
+    began = time.perf_counter()
+    for _ in range(args.menus):
+        sample_indexes(ids, args.amount, recent, rnd)
+    elapsed = time.perf_counter() - began
+    print(f"{elapsed / args.menus * 1e6:.2f} us per menu (catalog={args.catalog}, amount={args.amount})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Concurrent range readers against a local file.
+
+    python -m benchmarks.video_range --size-mb 256 --readers 1 8 32 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import random
+import tempfile
+import time
+from src.diet.video import VideoResponse
+
+
+async def read_range(path: pathlib.Path, stat: os.stat_result, start: int, end: int) -> int:
+    received = 0
+
+    async def receive():
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal received
+        if message['type'] == 'http.response.body':
+            received += len(message['body'])
+
+    await VideoResponse(path, stat, (start, end), '"bench"')({'type': 'http', 'method': 'GET'}, receive, send)
+    return received
+
+
+async def run(path: pathlib.Path, readers: int, requests: int, range_size: int) -> tuple[float, int, list[float]]:
+    stat = path.stat()
+    rnd = random.Random(readers)
+    latencies = []
+    total = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        start = rnd.randrange(0, max(stat.st_size - range_size, 1))
+        queue.put_nowait((start, min(start + range_size, stat.st_size) - 1))
+
+    async def reader():
+        nonlocal total
+        while not queue.empty():
+            start, end = queue.get_nowait()
+            began = time.perf_counter()
+            total += await read_range(path, stat, start, end)
+            latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(reader() for _ in range(readers)))
+    return time.perf_counter() - began, total, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--file', type=pathlib.Path, default=None)
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--range-kb', type=int, default=2048)
+    parser.add_argument('--readers', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        tmp = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
+        with tmp:
+            for _ in range(args.size_mb):
+                tmp.write(os.urandom(1024 * 1024))
+        path = pathlib.Path(tmp.name)
+    try:
+        print(f"{'readers':>8} {'MB/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for readers in args.readers:
+            elapsed, total, latencies = asyncio.run(run(path, readers, args.requests, args.range_kb * 1024))
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+            print(f"{readers:>8} {total / elapsed / 1024 / 1024:>10.1f} {p50:>10.2f} {p99:>10.2f}")
+    finally:
+        if args.file is None:
+            path.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,14 @@
-import uvicorn
 from fastapi import FastAPI, Path, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from routers import router
 from settings import settings
 from fastapi.middleware.cors import CORSMiddleware
+from src.database.database import RecentWritesMiddleware
+from src.database.instrumentation import QueryStatsMiddleware
+from src.database.migrate import migrate
+from src.etag import ETagMiddleware
+from src.metrics import MetricsMiddleware, mark_process_dead
+from src.profiling import ProfilingMiddleware
 import os
 from contextlib import asynccontextmanager
 
@@ -11,11 +16,12 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if not os.path.exists('media/images'):
-        os.makedirs('media/images')
-    os.system('alembic upgrade head')
+        os.makedirs('media/images', exist_ok=True)
+    await migrate()
     yield
+    mark_process_dead()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "http://localhost",
@@ -29,6 +35,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ETagMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(RecentWritesMiddleware)
+if settings.profiling.enabled:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(router)
 
 
@@ -48,6 +60,7 @@ async def home():
 
 
 def main():
+    import uvicorn
     uvicorn.run(app=app, host=settings.host, port=settings.port)
 
 
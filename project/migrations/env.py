@@ -18,7 +18,7 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+if config.config_file_name is not None and config.attributes.get('configure_logger', True):
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -87,6 +87,11 @@ async def run_async_migrations() -> None:
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
 
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        # in-process upgrade from src.database.migrate, the connection is already locked
+        do_run_migrations(connection)
+        return
     asyncio.run(run_async_migrations())
 
 
@@ -0,0 +1,45 @@
+"""daily nutrition
+
+Revision ID: 5c1f0a7d9b21
+Revises: 02296be1006a
+Create Date: 2026-10-19 10:12:31.114502
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f0a7d9b21'
+down_revision: Union[str, None] = '02296be1006a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_nutrition',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('calories', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('items', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['accounts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'date', name='uix_daily_nutrition_user_date')
+    )
+    # backfill from the menus that already exist
+    op.execute("""
+        INSERT INTO daily_nutrition (user_id, date, calories, price, items)
+        SELECT menus.user_id, menus.date, SUM(products.calories), SUM(products.price), COUNT(*)
+        FROM menus
+        JOIN menu_items ON menu_items.menu_id = menus.id
+        JOIN products ON products.id = menu_items.product_id
+        GROUP BY menus.user_id, menus.date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_nutrition')
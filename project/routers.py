@@ -5,3 +5,8 @@ router.include_router(home_router)
 router.include_router(auth_router)
 router.include_router(database_router)
 router.include_router(diet_router)
+router.include_router(jobs_router)
+router.include_router(batch_router)
+router.include_router(events_router)
+router.include_router(metrics_router)
+router.include_router(profiling_router)
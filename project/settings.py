@@ -1,18 +1,41 @@
 import pathlib
-from os import getenv
-from dotenv import load_dotenv
-from dataclasses import dataclass
+from os import environ, getenv
+from dataclasses import dataclass, field
 
-assert load_dotenv(), '.env not found'
+# uvicorn workers and reloads inherit the environment of the process that read .env first,
+# with an env_file in docker compose the variables are there without a .env file
+if not getenv('DOTENV_LOADED'):
+    from dotenv import load_dotenv
+    assert load_dotenv(pathlib.Path(__file__).parent / '.env') or getenv('DATABASE_NAME'), '.env not found'
+    environ['DOTENV_LOADED'] = '1'
 
 
 @dataclass
 class DatabaseSettings:
+    """
+    - pool_* : sqlalchemy QueuePool options, per worker process
+    - statement_cache_size : prepared statements asyncpg keeps per connection, 0 behind pgbouncer
+    - replica_urls : read replicas used by get_read_session
+    - read_your_writes_window : seconds a client's reads stay on the primary after it wrote
+    - replica_retry_after : seconds an unreachable replica is skipped
+    - strict_loading : 'raise' (lazy loads that need sql raise), 'warn' (they are logged) or 'off',
+      'warn' by default, the development compose and the tests set 'raise'
+    """
     user: str
     password: str
     host: str
     port: str
     name: str
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100
+    replica_urls: list[str] = field(default_factory=list)
+    read_your_writes_window: float = 5
+    replica_retry_after: float = 10
+    strict_loading: str = 'warn'
 
     @property
     def url(self) -> str:
@@ -26,20 +49,101 @@ class AuthSettings:
             access_token_life_time: float | None = None,
             refresh_token_life_time: float | None = None,
             algorithm: str | None = None,
-            max_enter_attempts: int | None = None
+            max_enter_attempts: int | None = None,
+            hash_workers: int | None = None
     ) -> None:
         """
         :param secret_key: str Secret key for jwt
         :param access_token_life_time: float Lifetime in hours
         :param refresh_token_life_time: float Lifetime in hours
+        :param hash_workers: int Threads per worker process that run bcrypt
         """
         self.secret_key: str = secret_key or getenv('SECRET_KEY')
         self.access_token_life_time: float = access_token_life_time or float(getenv('ACCESS_TOKEN_LIFETIME'))
         self.refresh_token_life_time: float = refresh_token_life_time or float(getenv('REFRESH_TOKEN_LIFETIME'))
         self.algorithm: str = algorithm or getenv('ALGORITHM')
         self.max_enter_attempts: int = max_enter_attempts or int(getenv('MAX_ENTER_ATTEMPTS'))
+        self.hash_workers: int = hash_workers or int(getenv('PASSWORD_HASH_WORKERS', 2))
 
 
+@dataclass
+class MediaSettings:
+    """
+    - root : directory served under /media
+    - accel_redirect : hand file bodies to nginx through X-Accel-Redirect
+    - accel_prefix : internal nginx location that maps onto root
+    - chunk_size : bytes per body message when the app streams files itself
+    """
+    root: pathlib.Path
+    accel_redirect: bool
+    accel_prefix: str
+    chunk_size: int
+
+
+@dataclass
+class CacheSettings:
+    """
+    - redis_url : cache shared by all workers, an in-process LRU is used when it is empty
+    - prefix : namespace of the keys in redis
+    - default_ttl : seconds
+    - max_entries : size of the in-process LRU
+    - lock_timeout : seconds a worker rebuilding an entry keeps the others waiting
+    """
+    redis_url: str | None
+    prefix: str
+    default_ttl: float
+    max_entries: int
+    lock_timeout: float
+
+
+@dataclass
+class JobSettings:
+    """
+    - concurrency : jobs one worker process runs at the same time
+    - poll_interval : seconds an idle worker waits before looking for due jobs again
+    - timeout : seconds a job may run before the worker cancels it
+    - reclaim_grace : seconds past timeout after which a running job belongs to a dead worker and is claimed again
+    - backoff : seconds before the first retry, doubled for every next one up to max_backoff
+    - max_attempts : default attempts per job
+    """
+    concurrency: int
+    poll_interval: float
+    timeout: float
+    reclaim_grace: float
+    backoff: float
+    max_backoff: float
+    max_attempts: int
+
+
+@dataclass
+class EventSettings:
+    """
+    - redis_url : pub/sub that carries the events of a worker (or of the job worker) to all of them,
+      events stay inside the publishing process when it is empty
+    - prefix : namespace of the channels in redis
+    - ping_interval : seconds between pings on an idle websocket, below the proxy read timeout
+    - queue_size : events buffered per websocket, the oldest are dropped for a slow client
+    """
+    redis_url: str | None
+    prefix: str
+    ping_interval: float
+    queue_size: int
+
+
+@dataclass
+class ProfilingSettings:
+    """
+    - enabled : installs the profiling middleware, nothing runs per request when false
+    - sample_rate : share of all requests profiled, 0 profiles only admin requests sent with the X-Profile header
+    - interval : seconds between two stack samples of a profiled request
+    - directory : where the profiles are kept
+    - max_profiles : profiles kept, the oldest are deleted
+    """
+    enabled: bool
+    sample_rate: float
+    interval: float
+    directory: pathlib.Path
+    max_profiles: int
 
 
 @dataclass(frozen=True)
@@ -50,6 +154,11 @@ class Settings:
     protocol: str
     database: DatabaseSettings
     auth: AuthSettings
+    media: MediaSettings
+    cache: CacheSettings
+    jobs: JobSettings
+    events: EventSettings
+    profiling: ProfilingSettings
 
 
 settings = Settings(
@@ -63,6 +172,51 @@ settings = Settings(
         host=getenv('DATABASE_HOST'),
         port=getenv('DATABASE_PORT'),
         name=getenv('DATABASE_NAME'),
+        pool_size=int(getenv('DATABASE_POOL_SIZE', 10)),
+        max_overflow=int(getenv('DATABASE_MAX_OVERFLOW', 10)),
+        pool_timeout=float(getenv('DATABASE_POOL_TIMEOUT', 30)),
+        pool_recycle=int(getenv('DATABASE_POOL_RECYCLE', 1800)),
+        pool_pre_ping=getenv('DATABASE_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        statement_cache_size=int(getenv('DATABASE_STATEMENT_CACHE_SIZE', 100)),
+        replica_urls=[url.strip() for url in getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()],
+        read_your_writes_window=float(getenv('DATABASE_READ_YOUR_WRITES_WINDOW', 5)),
+        replica_retry_after=float(getenv('DATABASE_REPLICA_RETRY_AFTER', 10)),
+        strict_loading=getenv('DATABASE_STRICT_LOADING', 'warn'),
+    ),
+    auth=AuthSettings(),
+    media=MediaSettings(
+        root=pathlib.Path(__file__).parent.absolute() / 'media',
+        accel_redirect=getenv('MEDIA_ACCEL_REDIRECT', 'false').lower() in ('1', 'true', 'yes'),
+        accel_prefix=getenv('MEDIA_ACCEL_PREFIX', '/protected/media/'),
+        chunk_size=int(getenv('MEDIA_CHUNK_SIZE', 512 * 1024)),
+    ),
+    cache=CacheSettings(
+        redis_url=getenv('REDIS_URL') or None,
+        prefix=getenv('CACHE_PREFIX', 'hackaton:'),
+        default_ttl=float(getenv('CACHE_DEFAULT_TTL', 60)),
+        max_entries=int(getenv('CACHE_MAX_ENTRIES', 10_000)),
+        lock_timeout=float(getenv('CACHE_LOCK_TIMEOUT', 10)),
+    ),
+    jobs=JobSettings(
+        concurrency=int(getenv('JOBS_CONCURRENCY', 4)),
+        poll_interval=float(getenv('JOBS_POLL_INTERVAL', 1)),
+        timeout=float(getenv('JOBS_TIMEOUT', 300)),
+        reclaim_grace=float(getenv('JOBS_RECLAIM_GRACE', 60)),
+        backoff=float(getenv('JOBS_BACKOFF', 5)),
+        max_backoff=float(getenv('JOBS_MAX_BACKOFF', 600)),
+        max_attempts=int(getenv('JOBS_MAX_ATTEMPTS', 5)),
+    ),
+    events=EventSettings(
+        redis_url=getenv('REDIS_URL') or None,
+        prefix=getenv('EVENTS_PREFIX', 'hackaton:'),
+        ping_interval=float(getenv('EVENTS_PING_INTERVAL', 30)),
+        queue_size=int(getenv('EVENTS_QUEUE_SIZE', 100)),
     ),
-    auth=AuthSettings()
+    profiling=ProfilingSettings(
+        enabled=getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+        sample_rate=float(getenv('PROFILING_SAMPLE_RATE', 0)),
+        interval=float(getenv('PROFILING_INTERVAL', 0.005)),
+        directory=pathlib.Path(__file__).parent.absolute() / 'profiles',
+        max_profiles=int(getenv('PROFILING_MAX_PROFILES', 50)),
+    )
 )
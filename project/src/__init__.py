@@ -6,3 +6,13 @@ from .database.views import router as database_router
 from .database.models import *
 from .diet.views import router as diet_router
 from .diet.models import *
+from .jobs.views import router as jobs_router
+from .jobs.models import *
+from .batch.views import router as batch_router
+from .events.views import router as events_router
+from .metrics.views import router as metrics_router
+from .profiling.views import router as profiling_router
+from sqlalchemy.orm import configure_mappers
+
+# every model is imported by now: relationships are resolved once per process instead of by the first query
+configure_mappers()
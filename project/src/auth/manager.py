@@ -1,15 +1,19 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from passlib.context import CryptContext
 from settings import settings
 import jwt
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
-from src.database.database import AsyncSession, get_session
+from src.database.database import AsyncSession, get_session, async_session_maker
+from src.metrics.metrics import password_hash_queue, password_hash_duration
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Callable, TypeVar, Union
+import asyncio
+import functools
+import time
 
 # to get a string like this run:
 # openssl rand -hex 32
@@ -18,7 +22,36 @@ ALGORITHM = settings.auth.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.auth.access_token_life_time
 REFRESH_TOKEN_EXPIRE_MINUTES = settings.auth.refresh_token_life_time * 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt burns ~0.2 s of cpu per call (releasing the GIL), it must not run on the event loop
+password_executor = ThreadPoolExecutor(settings.auth.hash_workers, thread_name_prefix='bcrypt')
+
+T = TypeVar('T')
+
+
+async def in_password_pool(func: Callable[..., T], *args) -> T:
+    """
+    Runs a bcrypt call (verify_password, get_password_hash) in password_executor
+    """
+    password_hash_queue.inc()
+    submitted = time.perf_counter()
+
+    def run() -> T:
+        password_hash_queue.dec()
+        return func(*args)
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, run)
+    finally:
+        password_hash_duration.observe(time.perf_counter() - submitted)
+
+
+@functools.cache
+def password_context():
+    # passlib is imported with the first password, not with the app
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="account/token")
 
 credentials_exception = HTTPException(
@@ -31,11 +64,11 @@ class UserManager:
 
     @staticmethod
     def verify_password(plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password):
-        return pwd_context.hash(password)
+        return password_context().hash(password)
 
     async def create_access_token(self, session: AsyncSession, data: dict):
         from .models.session import SessionModel
@@ -62,7 +95,7 @@ class UserManager:
             payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
             if payload['type'] != 'refresh':
                 raise credentials_exception
-            if datetime.now() > payload['exp']:
+            if datetime.now(timezone.utc) > datetime.fromtimestamp(payload['exp'], timezone.utc):
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Refresh token is expired",
@@ -83,9 +116,20 @@ class UserManager:
 
 
     @staticmethod
-    async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], session: Annotated[AsyncSession, Depends(get_session)]):
+    async def get_current_user(
+            request: Request,
+            token: Annotated[str, Depends(oauth2_scheme)],
+            session: Annotated[AsyncSession, Depends(get_session)]
+    ):
+        """
+        Session of the access token, looked up once per request: the sub-requests of /batch
+        share request.state and reuse it
+        """
         from .models.session import SessionModel
 
+        current = getattr(request.state, 'current_user', None)
+        if current is not None and current[0] == token:
+            return current[1]
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             if payload['type'] != 'access':
@@ -100,10 +144,37 @@ class UserManager:
             user_session: SessionModel = (await session.execute(select(SessionModel).filter(SessionModel.id == session_id).options(joinedload(SessionModel.user)))).scalars().one_or_none()
             if not user_session:
                 raise credentials_exception
+            request.state.current_user = (token, user_session)
             return user_session
         except (InvalidTokenError, ValueError):
             raise credentials_exception
 
+    @staticmethod
+    async def get_session_user(token: str | None):
+        """
+        Account of an access token whose session is active, for code that can't use the Request based
+        dependencies (websockets, middleware) and must not keep a pooled connection: the session is
+        checked with a short lived database session
+        :param token: access token
+        :return: AccountModel, None when the token or its session is not valid
+        """
+        from .models.session import SessionModel
+
+        try:
+            payload = jwt.decode(token or '', SECRET_KEY, algorithms=[ALGORITHM])
+        except InvalidTokenError:
+            return None
+        if payload.get('type') != 'access':
+            return None
+        async with async_session_maker() as session:
+            user_session = (await session.execute(
+                select(SessionModel).filter(SessionModel.id == payload.get('session_id'))
+                .options(joinedload(SessionModel.user))
+            )).scalars().one_or_none()
+        if user_session is None or not user_session.active:
+            return None
+        return user_session.user
+
     @staticmethod
     def verify_user(token: Annotated[str, Depends(oauth2_scheme)]):
         try:
@@ -118,4 +189,10 @@ class UserManager:
                 )
             return True
         except (InvalidTokenError, ValueError):
-            raise credentials_exception
\ No newline at end of file
+            raise credentials_exception
+
+
+async def get_current_admin(user_session=Depends(UserManager.get_current_user)):
+    if not user_session.active or not user_session.user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return user_session
@@ -1,4 +1,5 @@
 from .account import AccountModel
 from .user_info import UserInfo
 from .session import SessionModel
-from .user_goal import UserGoal
\ No newline at end of file
+from .user_goal import UserGoal
+from .nutrition_target import NutritionTarget
\ No newline at end of file
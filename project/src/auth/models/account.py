@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.database.models import BaseModel
 from sqlalchemy import String
-from src.database.types import str_64, str_256
+from src.database.types import str_64, str_256, bool_default_false
 from src.auth.manager import UserManager
 from datetime import date
 
@@ -15,6 +15,7 @@ class AccountModel(BaseModel, UserManager):
     sessions: Mapped[list["SessionModel"]] = relationship(back_populates='user')
     birth_date: Mapped[date]
     gender: Mapped[bool]
+    is_admin: Mapped[bool_default_false]
 
     def __str__(self):
         return f"<AccountModel: (username={self.username}, phone={self.phone})>"
@@ -0,0 +1,15 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from src.database.models import BaseModel
+from sqlalchemy import ForeignKey
+from datetime import datetime
+
+
+class NutritionTarget(BaseModel):
+    __tablename__ = "nutrition_targets"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete="CASCADE"), unique=True)
+    calories: Mapped[int]
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+    def __str__(self):
+        return f"{self.calories}"
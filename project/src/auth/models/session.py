@@ -5,7 +5,7 @@ from sqlalchemy import ForeignKey
 
 class SessionModel(BaseModel):
     __tablename__ = 'sessions'
-    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete='CASCADE'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete='CASCADE'), index=True)
     user: Mapped['AccountModel'] = relationship(back_populates="sessions")
     active: Mapped[bool] = mapped_column(default=True)
 
@@ -8,6 +8,6 @@ from datetime import datetime
 class UserGoal(BaseModel):
     __tablename__ = "user_goal"
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete="CASCADE"))
+    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete="CASCADE"), index=True)
     goal: Mapped[Enum] = mapped_column(Enum("loss", "gain", "maintain", name="goal_type"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
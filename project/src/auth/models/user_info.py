@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.database.models import BaseModel
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from src.database.types import str_64
 from datetime import datetime
 
@@ -16,5 +16,10 @@ class UserInfo(BaseModel):
 
     user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete="CASCADE"))
 
+    __table_args__ = (
+        # latest / week old measurements of a user
+        Index('ix_user_info_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     def __str__(self):
         return f"{self.weight}"
\ No newline at end of file
@@ -0,0 +1,141 @@
+import asyncio
+from datetime import date, datetime
+from sqlalchemy import select, desc
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.uow import Staged
+from .models import AccountModel, UserInfo, UserGoal, NutritionTarget
+
+# light exercise 1-3 days a week
+ACTIVITY_FACTOR = 1.375
+GOAL_ADJUSTMENT = {
+    'loss': -500,
+    'maintain': 0,
+    'gain': 300,
+}
+
+
+def daily_calories(weight, height, age, male, adjustment):
+    """
+    Mifflin-St Jeor BMR times activity factor plus goal adjustment.
+    Works both for plain numbers and for numpy arrays.
+    :param weight: kg
+    :param height: cm
+    :param age: full years
+    :param male: AccountModel.gender
+    :param adjustment: GOAL_ADJUSTMENT value
+    """
+    # +5 for men, -161 for women
+    bmr = 10 * weight + 6.25 * height - 5 * age + male * 166 - 161
+    return bmr * ACTIVITY_FACTOR + adjustment
+
+
+def age_on(birth_date: date, today: date) -> int:
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+async def update_target(
+        session: AsyncSession,
+        account: AccountModel | Staged,
+        weight: float | None = None,
+        height: float | None = None,
+        goal: str | None = None
+) -> int | None:
+    """
+    Recomputes the stored target of one user. Missing measurements and goal are read from the database.
+    The caller commits.
+    :param account: the user, or its row staged in the caller's UnitOfWork once flushed (register)
+    :return: new daily calories or None when the user has no measurements yet
+    """
+    if weight is None or height is None:
+        latest = (await session.execute(
+            select(UserInfo.weight, UserInfo.height)
+            .where(UserInfo.user_id == account.id)
+            .order_by(desc(UserInfo.created_at))
+            .limit(1)
+        )).first()
+        if latest is None:
+            return None
+        weight, height = latest
+    if goal is None:
+        goal = (await session.execute(select(UserGoal.goal).where(UserGoal.user_id == account.id))).scalar()
+
+    calories = round(daily_calories(
+        weight, height, age_on(account.birth_date, date.today()), account.gender, GOAL_ADJUSTMENT.get(goal, 0)
+    ))
+    await _upsert(session, [{'user_id': account.id, 'calories': calories, 'updated_at': datetime.utcnow()}])
+    return calories
+
+
+async def get_target(session: AsyncSession, user_id: int) -> int | None:
+    return (await session.execute(
+        select(NutritionTarget.calories).where(NutritionTarget.user_id == user_id)
+    )).scalar()
+
+
+async def recompute_all(session: AsyncSession) -> int:
+    """
+    Recomputes targets of every user that has measurements in one vectorised pass.
+    :return: number of updated users
+    """
+    import numpy as np
+    latest = (
+        select(UserInfo.user_id, UserInfo.weight, UserInfo.height)
+        .distinct(UserInfo.user_id)
+        .order_by(UserInfo.user_id, desc(UserInfo.created_at))
+        .subquery()
+    )
+    rows = (await session.execute(
+        select(latest.c.user_id, latest.c.weight, latest.c.height, AccountModel.birth_date, AccountModel.gender,
+               UserGoal.goal)
+        .join(AccountModel, AccountModel.id == latest.c.user_id)
+        .outerjoin(UserGoal, UserGoal.user_id == latest.c.user_id)
+    )).all()
+    if not rows:
+        return 0
+
+    user_ids, weights, heights, births, genders, goals = zip(*rows)
+    births = np.array(births, dtype='datetime64[D]')
+    years = births.astype('datetime64[Y]').astype(int) + 1970
+    months = births.astype('datetime64[M]').astype(int) % 12 + 1
+    days = (births - births.astype('datetime64[M]')).astype(int) + 1
+    today = date.today()
+    ages = today.year - years - ((months * 100 + days) > (today.month * 100 + today.day))
+
+    calories = np.rint(daily_calories(
+        np.array(weights, dtype=float),
+        np.array(heights, dtype=float),
+        ages,
+        np.array(genders, dtype=bool),
+        np.array([GOAL_ADJUSTMENT.get(goal, 0) for goal in goals], dtype=float),
+    )).astype(int)
+
+    now = datetime.utcnow()
+    await _upsert(session, [
+        {'user_id': user_id, 'calories': int(value), 'updated_at': now}
+        for user_id, value in zip(user_ids, calories)
+    ])
+    return len(user_ids)
+
+
+async def _upsert(session: AsyncSession, values: list[dict], batch_size: int = 5000) -> None:
+    # keeps every statement below the 32767 bind parameters postgres accepts
+    for offset in range(0, len(values), batch_size):
+        stmt = insert(NutritionTarget).values(values[offset:offset + batch_size])
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[NutritionTarget.user_id],
+            set_={'calories': stmt.excluded.calories, 'updated_at': stmt.excluded.updated_at},
+        ))
+
+
+async def main():
+    from src.database.database import async_session_maker
+
+    async with async_session_maker() as session:
+        count = await recompute_all(session)
+        await session.commit()
+    print(f"recomputed nutrition targets of {count} users")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -3,20 +3,36 @@ from fastapi import APIRouter, Depends, Body, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from src.database.database import get_session
+from src.database.database import get_session, get_read_session
+from src.database.uow import UnitOfWork
 from .schemas import Token, User, UserInDB, UserInfoSchema, UserResponse, UserGoalSchema
 from .models import AccountModel, SessionModel, UserInfo, UserGoal
-from .manager import credentials_exception, oauth2_scheme, UserManager
+from .manager import credentials_exception, oauth2_scheme, UserManager, in_password_pool
 from datetime import datetime, timedelta, date
 from sqlalchemy import select, desc
 from fastapi import HTTPException, status
-from src.diet.menu import generate_menu
-from src.diet.models import MealTimes
-from src.diet.models import ProductTypes
+from src.diet.tasks import first_menu
+from src.cache import cache
+from src.etag import etag_route
+from src.events import publish
+from .targets import update_target
 
 router = APIRouter(prefix='/account', tags=['account'])
 
 
+def info_tag(user_id: int) -> str:
+    return f'info:{user_id}'
+
+
+def goal_tag(user_id: int) -> str:
+    return f'goal:{user_id}'
+
+
+etag_route(f'{router.prefix}/')
+etag_route(f'{router.prefix}/info', tags=lambda user_id: (info_tag(user_id),))
+etag_route(f'{router.prefix}/goal', tags=lambda user_id: (goal_tag(user_id),))
+
+
 @router.post("/token", response_model=Token)
 async def login(
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
@@ -27,7 +43,7 @@ async def login(
     )).scalars().one_or_none()
     if not user:
         raise credentials_exception
-    if user.verify_password(form_data.password, user.password):
+    if await in_password_pool(user.verify_password, form_data.password, user.password):
         access_token, user_session_id = await user.create_access_token(
             session,
             data={"username": user.username},
@@ -41,13 +57,14 @@ async def login(
 async def refresh(
         token: Annotated[str, Depends(oauth2_scheme)], session: Annotated[AsyncSession, Depends(get_session)]
 ):
-    access_token, = await UserManager.refresh_access_token(token, session)
+    access_token, _ = await UserManager.refresh_access_token(token, session)
     return Token(access_token=access_token, token_type="bearer", refresh_token=token)
 
 
 @router.post('/')
 async def create_account(response: Response, data: UserInDB = Body(), session: AsyncSession = Depends(get_session)):
-    user = AccountModel(username=data.username, password=AccountModel.get_password_hash(data.password),
+    password = await in_password_pool(AccountModel.get_password_hash, data.password)
+    user = AccountModel(username=data.username, password=password,
                         phone=data.phone, birth_date=data.birth_date, gender=data.gender)
     try:
         session.add(user)
@@ -83,7 +100,7 @@ async def get_me(
 @router.get('/info')
 async def get_user_info(
         user_session: SessionModel = Depends(AccountModel.get_current_user),
-        session: AsyncSession = Depends(get_session)
+        session: AsyncSession = Depends(get_read_session)
 ):
     if user_session.active:
         stmt = select(AccountModel, UserInfo).join(UserInfo, UserInfo.user_id == AccountModel.id).filter(
@@ -127,7 +144,7 @@ async def get_user_info(
 
 
 @router.get("/user_info")
-async def get_user_info(session: AsyncSession = Depends(get_session)):
+async def get_user_info(session: AsyncSession = Depends(get_read_session)):
     try:
         stmt = select(UserInfo)
         result = await session.execute(stmt)
@@ -152,13 +169,21 @@ async def get_user_info(session: AsyncSession = Depends(get_session)):
 @router.post('/register')
 async def register(users: UserInfoSchema, response: Response, session: AsyncSession = Depends(get_session),
                    data: UserInDB = Body()):
-    user = AccountModel(username=data.username, password=AccountModel.get_password_hash(data.password),
-                        phone=data.phone, birth_date=data.birth_date, gender=data.gender)
-
+    password = await in_password_pool(AccountModel.get_password_hash, data.password)
+    uow = UnitOfWork(session)
+    user = uow.add(AccountModel, username=data.username, password=password,
+                   phone=data.phone, birth_date=data.birth_date, gender=data.gender, is_admin=False)
+    new_user_info = uow.add(
+        UserInfo,
+        weight=users.weight,
+        height=users.height,
+        chest_size=users.chest_size,
+        waist_size=users.waist_size,
+        hips_size=users.hips_size,
+        user_id=user
+    )
     try:
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
+        await uow.flush()
     except IntegrityError as err:
         field = str(err.orig).split('.')[-1]
         response.status_code = status.HTTP_409_CONFLICT
@@ -176,42 +201,16 @@ async def register(users: UserInfoSchema, response: Response, session: AsyncSess
             ]
         }
 
-    new_user_info = UserInfo(
-        weight=users.weight,
-        height=users.height,
-        chest_size=users.chest_size,
-        waist_size=users.waist_size,
-        hips_size=users.hips_size,
-        user_id=user.id
+    daily_calories = await update_target(session, user, weight=users.weight, height=users.height, goal='maintain')
+    menu_job = await first_menu.enqueue(
+        session, owner=user.id, user_id=user.id, daily_calories=daily_calories, date=date.today().isoformat()
     )
-
-    session.add(new_user_info)
     await session.commit()
-
-    await session.refresh(new_user_info)
-    age = datetime.utcnow().year - user.birth_date.year
-    for_men = lambda h, w: ((10 * w) + (6.25 * h) - (5 * age) + 5, (10 * w) + (6.25 * h) - (5 * age) + 20)
-    for_women = lambda h, w: ((10 * w) + (6.25 * h) - (5 * age) + 161, (10 * w) + (6.25 * h) - (5 * age) + 200)
-    calories = for_men(users.weight, users.height) if user.gender else for_women
-
-    types_amount = {
-        ProductTypes.FOOD: 1,
-        ProductTypes.FRUIT: 2,
-        ProductTypes.DAIRY: 1
+    return {
+        "message": "User Info updated successfully",
+        "user_info": new_user_info.as_dict(),
+        "menu_job_id": menu_job.id,
     }
-    try:
-        await generate_menu(
-            user,
-            meal_time=MealTimes.BREAKFAST,
-            date=date.today(),
-            calories=calories,
-            types_amount=types_amount,
-            session=session,
-        )
-    except ValueError:
-        pass
-
-    return {"message": "User Info updated successfully", "user_info": new_user_info}
 
 
 @router.post('/info', response_model=UserInfoSchema)
@@ -231,7 +230,9 @@ async def post_user_info(
 
     if latest_info and latest_info.created_at > one_week_ago:
         raise HTTPException(status_code=403, detail="You can only input data once a week.")
-    new_user_info = UserInfo(
+    uow = UnitOfWork(session)
+    new_user_info = uow.add(
+        UserInfo,
         weight=new_data.weight,
         height=new_data.height,
         chest_size=new_data.chest_size,
@@ -240,10 +241,11 @@ async def post_user_info(
         created_at=datetime.utcnow(),
         user_id=account.id
     )
-
-    session.add(new_user_info)
+    await uow.flush()
+    await update_target(session, account, weight=new_data.weight, height=new_data.height)
     await session.commit()
-    await session.refresh(new_user_info)
+    await cache.invalidate_tags(info_tag(account.id))
+    await publish(account.id, 'info.updated')
 
     return {
         "weight": new_user_info.weight,
@@ -257,7 +259,7 @@ async def post_user_info(
 @router.get('/info/progress', response_model=UserResponse)
 async def get_user_progress(
         user_session: SessionModel = Depends(AccountModel.get_current_user),
-        session: AsyncSession = Depends(get_session)
+        session: AsyncSession = Depends(get_read_session)
 ):
     if user_session.active:
         account = user_session.user
@@ -318,7 +320,10 @@ async def set_goal(
             user_id=account.id
         )
         session.add(user_goal)
+    await update_target(session, account, goal=goal_data.goal.value)
     await session.commit()
+    await cache.invalidate_tags(goal_tag(account.id))
+    await publish(account.id, 'goal.updated', goal=goal_data.goal.value)
     await session.refresh(user_goal)
     return user_goal
 
@@ -326,7 +331,7 @@ async def set_goal(
 @router.get('/goal', response_model=UserGoalSchema)
 async def get_goal(
         user_session: SessionModel = Depends(AccountModel.get_current_user),
-        session: AsyncSession = Depends(get_session)
+        session: AsyncSession = Depends(get_read_session)
 ):
     if not user_session.active:
         raise HTTPException(status_code=404, detail="Inactive User")
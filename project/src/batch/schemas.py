@@ -0,0 +1,14 @@
+from typing import Any
+from pydantic import BaseModel, Field
+
+
+class BatchRequestSchema(BaseModel):
+    # path with the query string, e.g. /diet/nutrition?start=2024-01-01
+    path: str = Field(pattern=r'^/')
+
+
+class BatchResponseSchema(BaseModel):
+    path: str
+    status: int
+    # JSON body of the sub-request, null when it is not JSON
+    body: Any
@@ -0,0 +1,80 @@
+import logging
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from src.auth.manager import UserManager
+from src.database.database import get_session, get_read_session, AsyncSession
+from .schemas import BatchRequestSchema, BatchResponseSchema
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix='/batch', tags=['batch'])
+
+MAX_REQUESTS = 20
+
+
+async def run_subrequest(request: Request, path: str) -> tuple[int, bytes | None]:
+    """
+    Runs GET path through the router inside this request: the sub-request shares request.state,
+    so the sessions and the authenticated user of the batch.
+    :return: status and JSON body, None for another content type
+    """
+    path, _, query = path.partition('?')
+    scope = {
+        **request.scope,
+        'method': 'GET',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': [(k, v) for k, v in request.scope['headers'] if k not in (b'content-length', b'content-type')],
+    }
+    start, chunks = {}, []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            start.update(message)
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await request.app.router(scope, receive, send)
+    content_type = Headers(raw=start.get('headers', [])).get('content-type', '')
+    return start['status'], b''.join(chunks) if content_type.startswith('application/json') else None
+
+
+@router.post('', response_model=list[BatchResponseSchema])
+async def batch(
+        request: Request,
+        requests: list[BatchRequestSchema] = Body(max_length=MAX_REQUESTS),
+        session: AsyncSession = Depends(get_session),
+        _read_session: AsyncSession = Depends(get_read_session),
+        _user_session=Depends(UserManager.get_current_user),
+):
+    """
+    Runs GET sub-requests one after another and answers them in one response.
+    The user is authenticated once and the sub-requests reuse the sessions opened here,
+    one after another because a session runs one statement at a time.
+    """
+    if any(item.path.partition('?')[0].rstrip('/') == router.prefix for item in requests):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Nested batch')
+    parts = []
+    for item in requests:
+        try:
+            code, body = await run_subrequest(request, item.path)
+        except StarletteHTTPException as err:
+            # raised by the router itself (404, 405), outside of any route's exception handling
+            code, body = err.status_code, orjson.dumps({'detail': err.detail})
+        except Exception:
+            logger.exception("batch sub-request %s failed", item.path)
+            # the rollback expires the user loaded for the batch, the next sub-request loads it again
+            await session.rollback()
+            request.state.current_user = None
+            code, body = status.HTTP_500_INTERNAL_SERVER_ERROR, None
+        # the bodies are JSON already, they are spliced in instead of parsed and dumped again
+        parts.append(
+            b'{"path":%b,"status":%d,"body":%b}' % (orjson.dumps(item.path), code, body or b'null')
+        )
+    return Response(content=b'[' + b','.join(parts) + b']', media_type='application/json')
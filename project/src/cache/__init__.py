@@ -0,0 +1,2 @@
+from .cache import Cache, cache, cached
+from .backends import MemoryBackend, RedisBackend
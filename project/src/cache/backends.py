@@ -0,0 +1,156 @@
+import logging
+import pickle
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError, LockError
+
+logger = logging.getLogger(__name__)
+
+# returned by get() on a miss, None is a valid cached value
+MISSING = object()
+
+
+class MemoryBackend:
+    """
+    LRU of python objects inside one worker process, used when no redis is configured and in tests.
+    Values stored without a ttl, e.g. the catalog version, are not counted nor evicted by the LRU.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, tuple[float | None, Any, tuple[str, ...]]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._kept: set[str] = set()
+
+    async def get(self, key: str) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            return MISSING
+        expires, value, _ = item
+        if expires is not None and expires < time.monotonic():
+            self._remove(key)
+            return MISSING
+        self._items.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float | None, tags: tuple[str, ...]) -> None:
+        self._remove(key)
+        self._items[key] = (None if ttl is None else time.monotonic() + ttl, value, tags)
+        if ttl is None:
+            self._kept.add(key)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._items) - len(self._kept) > self.max_entries:
+            self._remove(next(key for key in self._items if key not in self._kept))
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._remove(key)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._remove(key)
+
+    def lock(self, key: str, timeout: float):
+        # the per key asyncio lock of Cache already serializes one process
+        return nullcontext()
+
+    def _remove(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is None:
+            return
+        self._kept.discard(key)
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend:
+    """
+    Pickled values in redis shared by all workers. Tags are redis sets of the keys written with them.
+    Redis errors are logged and turn reads into misses, so an outage only costs the database work.
+    """
+
+    def __init__(self, url: str, prefix: str) -> None:
+        self.redis = aioredis.Redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        try:
+            raw = await self.redis.get(self.prefix + key)
+        except RedisError as err:
+            logger.warning("cache get %s failed: %s", key, err)
+            return MISSING
+        return MISSING if raw is None else pickle.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float | None, tags: tuple[str, ...]) -> None:
+        name = self.prefix + key
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(name, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=None if ttl is None else int(ttl * 1000))
+                for tag in tags:
+                    tag_name = self._tag(tag)
+                    pipe.sadd(tag_name, name)
+                    # a tag set lives as long as its longest living key
+                    if ttl is None:
+                        pipe.persist(tag_name)
+                    else:
+                        pipe.pexpire(tag_name, int(ttl * 1000), nx=True)
+                        pipe.pexpire(tag_name, int(ttl * 1000), gt=True)
+                await pipe.execute()
+        except RedisError as err:
+            logger.warning("cache set %s failed: %s", key, err)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self.redis.delete(*(self.prefix + key for key in keys))
+        except RedisError as err:
+            logger.error("cache delete %s failed, entries stay until their ttl: %s", keys, err)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        tag_names = [self._tag(tag) for tag in tags]
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag_name in tag_names:
+                    pipe.smembers(tag_name)
+                members = await pipe.execute()
+            names = {name for keys in members for name in keys}
+            await self.redis.delete(*names, *tag_names)
+        except RedisError as err:
+            logger.error("cache invalidate %s failed, entries stay until their ttl: %s", tags, err)
+
+    @asynccontextmanager
+    async def lock(self, key: str, timeout: float) -> AsyncIterator[None]:
+        """
+        Lets one worker rebuild key while the others wait for it, at most timeout seconds
+        after which the value is built anyway
+        """
+        lock = self.redis.lock(
+            f'{self.prefix}lock:{key}', timeout=timeout, blocking_timeout=timeout, sleep=0.05, thread_local=False
+        )
+        try:
+            acquired = await lock.acquire()
+        except RedisError as err:
+            logger.warning("cache lock %s failed: %s", key, err)
+            acquired = False
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except (LockError, RedisError):
+                    # expired while the value was built, someone else may hold it now
+                    pass
+
+    def _tag(self, tag: str) -> str:
+        return f'{self.prefix}tag:{tag}'
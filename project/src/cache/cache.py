@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import uuid
+import weakref
+from typing import Any, Awaitable, Callable, Iterable
+from settings import settings
+from src.metrics.metrics import cache_requests
+from .backends import MISSING, MemoryBackend, RedisBackend
+
+# versions expire after this long and the next reader starts a new one, clients revalidate once
+VERSION_TTL = 24 * 60 * 60
+
+
+class Cache:
+    """
+    get/set with ttls and tags over a MemoryBackend or RedisBackend.
+    get_or_set builds a missing value once: callers of one worker share an asyncio lock,
+    workers share the backend lock and read the value the first one stored.
+    """
+
+    def __init__(self, backend: MemoryBackend | RedisBackend, lock_timeout: float) -> None:
+        self.backend = backend
+        self.lock_timeout = lock_timeout
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        value = await self._lookup(key)
+        return default if value is MISSING else value
+
+    async def set(
+            self,
+            key: str,
+            value: Any,
+            ttl: float | None = settings.cache.default_ttl,
+            tags: Iterable[str] = ()
+    ) -> None:
+        """
+        :param ttl: seconds, None keeps the value until it is deleted, MemoryBackend does not evict it
+        :param tags: names invalidate_tags() drops the value by
+        """
+        await self.backend.set(key, value, ttl, tuple(tags))
+
+    async def delete(self, *keys: str) -> None:
+        await self.backend.delete(*keys)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        """
+        Drops the values stored with any of tags and starts a new version of each tag
+        """
+        await self.backend.invalidate_tags(*tags)
+        await self.backend.delete(*(f'version:{tag}' for tag in tags))
+
+    @property
+    def shared(self) -> bool:
+        return isinstance(self.backend, RedisBackend)
+
+    async def version(self, tag: str) -> str | None:
+        """
+        Opaque value that changes whenever tag is invalidated.
+        None with a per process backend, an invalidation in one worker would not reach the versions of the others.
+        """
+        if not self.shared:
+            return None
+        key = f'version:{tag}'
+        value = await self.backend.get(key)
+        if value is MISSING:
+            value = uuid.uuid4().hex
+            await self.backend.set(key, value, VERSION_TTL, ())
+        return value
+
+    async def get_or_set(
+            self,
+            key: str,
+            factory: Callable[[], Awaitable[Any]],
+            ttl: float | None = settings.cache.default_ttl,
+            tags: Iterable[str] = ()
+    ) -> Any:
+        """
+        :param factory: builds the value on a miss
+        """
+        value = await self._lookup(key)
+        if value is not MISSING:
+            return value
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        async with lock:
+            value = await self.backend.get(key)
+            if value is not MISSING:
+                return value
+            async with self.backend.lock(key, self.lock_timeout):
+                value = await self.backend.get(key)
+                if value is MISSING:
+                    value = await factory()
+                    await self.set(key, value, ttl, tags)
+        return value
+
+    async def _lookup(self, key: str) -> Any:
+        value = await self.backend.get(key)
+        cache_requests.labels(key.split(':', 1)[0], 'miss' if value is MISSING else 'hit').inc()
+        return value
+
+    def cached(
+            self,
+            key: Callable[..., str],
+            ttl: float | None = settings.cache.default_ttl,
+            tags: Callable[..., Iterable[str]] | None = None
+    ):
+        """
+        Caches the result of an async function. The result is pickled by redis and shared by the callers,
+        for a handler cache the serialized body and build the Response per request.
+        :param key: called with the arguments of the function, returns the cache key
+        :param tags: called with the arguments of the function, returns the tags of the entry
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await self.get_or_set(
+                    key(*args, **kwargs),
+                    functools.partial(func, *args, **kwargs),
+                    ttl,
+                    tags(*args, **kwargs) if tags else (),
+                )
+
+            return wrapper
+
+        return decorator
+
+
+def create_backend() -> MemoryBackend | RedisBackend:
+    if settings.cache.redis_url:
+        return RedisBackend(settings.cache.redis_url, settings.cache.prefix)
+    return MemoryBackend(settings.cache.max_entries)
+
+
+cache = Cache(create_backend(), settings.cache.lock_timeout)
+cached = cache.cached
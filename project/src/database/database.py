@@ -1,10 +1,34 @@
+import hashlib
+import math
+import time
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from fastapi import Request
+from sqlalchemy import event, exc, Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine, AsyncEngine
+from sqlalchemy.orm import DeclarativeBase, Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from settings import settings
+from .pool import InstrumentedQueuePool
 
 
-async_engine = create_async_engine(settings.database.url)
+def create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.database.pool_size,
+        max_overflow=settings.database.max_overflow,
+        pool_timeout=settings.database.pool_timeout,
+        pool_recycle=settings.database.pool_recycle,
+        pool_pre_ping=settings.database.pool_pre_ping,
+        connect_args={'prepared_statement_cache_size': settings.database.statement_cache_size},
+    )
+    engine.pool.name = f'{engine.url.host}:{engine.url.port}/{engine.url.database}'
+    return engine
+
+
+async_engine = create_engine(settings.database.url)
 async_session_maker = async_sessionmaker(async_engine, expire_on_commit=False)
 
 
@@ -12,6 +36,193 @@ class Base(DeclarativeBase):
     pass
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
+class ReplicaSet:
+    """
+    Read replicas picked round-robin. A replica that fails to give a connection is skipped for retry_after seconds.
+    """
+
+    def __init__(self, urls: list[str], retry_after: float) -> None:
+        self.engines = [create_engine(url) for url in urls]
+        self.session_makers = [async_sessionmaker(engine, expire_on_commit=False) for engine in self.engines]
+        self.retry_after = retry_after
+        self._down_until = [0.0] * len(urls)
+        self._next = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def candidates(self) -> list[int]:
+        """
+        :return: indexes of healthy replicas, starting from the next one in round-robin order
+        """
+        now = time.monotonic()
+        count = len(self.engines)
+        start, self._next = self._next, (self._next + 1) % count
+        return [i % count for i in range(start, start + count) if self._down_until[i % count] <= now]
+
+    def index(self, engine: Engine) -> int | None:
+        for i, replica in enumerate(self.engines):
+            if replica.sync_engine is engine:
+                return i
+        return None
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + self.retry_after
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {'url': engine.url.render_as_string(hide_password=True), 'healthy': self._down_until[i] <= now}
+            for i, engine in enumerate(self.engines)
+        ]
+
+
+class RecentWrites:
+    """
+    Clients (by Authorization header) that committed a write during the last `window` seconds.
+    The marker travels as a cookie living `window` seconds, so a read checks it without a round trip
+    and every worker sees the writes handled by the others.
+    """
+    cookie = 'wrote'
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+
+    @staticmethod
+    def marker(client: str) -> str:
+        return hashlib.blake2b(client.encode(), digest_size=16).hexdigest()
+
+    def set_cookie(self, marker: str) -> str:
+        """
+        :return: Set-Cookie header value carrying the marker
+        """
+        return f"{self.cookie}={marker}; Max-Age={math.ceil(self.window)}; Path=/; HttpOnly; SameSite=lax"
+
+    def contains(self, request: Request) -> bool:
+        client = request.headers.get('authorization')
+        return client is not None and request.cookies.get(self.cookie) == self.marker(client)
+
+
+class RecentWritesMiddleware:
+    """
+    Sends the recent_writes cookie with the response of a request that committed a write.
+    Dependencies with yield are closed before the response starts, so the marker is known by then.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_marker(message: Message) -> None:
+            if message['type'] == 'http.response.start' and (marker := scope.get('state', {}).get('wrote')):
+                MutableHeaders(scope=message).append('Set-Cookie', recent_writes.set_cookie(marker))
+            await send(message)
+
+        await self.app(scope, receive, send_with_marker)
+
+
+replicas = ReplicaSet(settings.database.replica_urls, settings.database.replica_retry_after)
+recent_writes = RecentWrites(settings.database.read_your_writes_window)
+
+
+@event.listens_for(Session, 'after_flush')
+def _flushed(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _committed(session):
+    # the marker is set by _request_session, which knows the request
+    if session.info.pop('wrote', False):
+        session.info['committed_write'] = True
+
+
+class ReadSession(Session):
+    """
+    Session of get_read_session. The replica is picked when the first statement needs a connection,
+    so requests answered without sql never touch a replica pool. Stale pooled connections are replaced
+    by pool_pre_ping; a replica that cannot give a connection is skipped for retry_after seconds and
+    the next one, or the primary, is used instead.
+    """
+
+    def get_bind(self, mapper=None, **kw):
+        if self.bind is None:
+            self.bind = _replica_engine()
+        return self.bind
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        while True:
+            try:
+                return super()._connection_for_bind(engine, execution_options, **kw)
+            except (OSError, exc.DBAPIError, exc.TimeoutError):
+                index = replicas.index(engine)
+                if index is None:
+                    raise
+                replicas.mark_down(index)
+                self.bind = engine = _replica_engine()
+
+
+def _replica_engine() -> Engine:
+    healthy = replicas.candidates()
+    return replicas.engines[healthy[0]].sync_engine if healthy else async_engine.sync_engine
+
+
+read_session_maker = async_sessionmaker(sync_session_class=ReadSession, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def _request_session(
+        request: Request,
+        attribute: str = 'db_session',
+        maker: async_sessionmaker = async_session_maker
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session kept in request.state under attribute: opened by the first dependency asking for it,
+    reused by the others (and by the sub-requests of /batch) and closed when the first one is done.
+    """
+    session = getattr(request.state, attribute, None)
+    if session is not None:
+        yield session
+        return
+    async with maker() as session:
+        session.info['client'] = request.headers.get('authorization')
+        setattr(request.state, attribute, session)
+        try:
+            yield session
+        finally:
+            setattr(request.state, attribute, None)
+            client = session.info['client']
+            if session.info.pop('committed_write', False) and client:
+                request.state.wrote = recent_writes.marker(client)
+
+
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Primary session shared by every dependency of a request (get_current_user and the handler).
+    It checks a connection out of the pool on the first statement only.
+    """
+    async with _request_session(request) as session:
+        yield session
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read only handlers: a healthy replica, or the request's primary session when there is none
+    or the client wrote something during the last read_your_writes_window seconds.
+    """
+    if not replicas or recent_writes.contains(request):
+        async with _request_session(request) as session:
+            yield session
+        return
+    async with _request_session(request, 'db_read_session', read_session_maker) as session:
         yield session
@@ -0,0 +1,133 @@
+import heapq
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+logger = logging.getLogger(__name__)
+
+# the same statement shape executed this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = 5
+SLOWEST = 5
+
+
+@dataclass
+class RequestQueries:
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    slowest: list[tuple[float, str]] = field(default_factory=list)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement] += 1
+        if len(self.slowest) < SLOWEST:
+            heapq.heappush(self.slowest, (duration, statement))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, statement))
+
+    def repeated(self) -> list[tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.items() if count >= N_PLUS_ONE_THRESHOLD]
+
+
+@dataclass
+class RouteQueries:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    db_time: float = 0.0
+    total_time: float = 0.0
+    n_plus_one: Counter = field(default_factory=Counter)
+    slowest: list[tuple[float, str]] = field(default_factory=list)
+
+    def add(self, request: RequestQueries, total: float) -> None:
+        self.requests += 1
+        self.queries += request.count
+        self.max_queries = max(self.max_queries, request.count)
+        self.db_time += request.duration
+        self.total_time += total
+        for shape, _ in request.repeated():
+            self.n_plus_one[shape] += 1
+        for item in request.slowest:
+            if len(self.slowest) < SLOWEST:
+                heapq.heappush(self.slowest, item)
+            elif item[0] > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def as_dict(self) -> dict:
+        return {
+            'requests': self.requests,
+            'queries_avg': round(self.queries / self.requests, 2),
+            'queries_max': self.max_queries,
+            'db_ms_avg': round(self.db_time / self.requests * 1000, 3),
+            'total_ms_avg': round(self.total_time / self.requests * 1000, 3),
+            'n_plus_one': [{'statement': shape, 'requests': count} for shape, count in self.n_plus_one.most_common()],
+            'slowest': [
+                {'ms': round(duration * 1000, 3), 'statement': statement}
+                for duration, statement in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+current_queries: ContextVar[RequestQueries | None] = ContextVar('current_queries', default=None)
+route_queries: dict[str, RouteQueries] = {}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    queries = current_queries.get()
+    if queries is not None:
+        queries.record(statement, duration)
+
+
+def route_name(scope: Scope) -> str:
+    route = scope.get('route')
+    return f"{scope['method']} {route.path if route else 'unmatched'}"
+
+
+class QueryStatsMiddleware:
+    """
+    Counts statements and database time of every http request,
+    sends them as a Server-Timing header and aggregates them per route.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                total = (time.perf_counter() - started) * 1000
+                MutableHeaders(scope=message).append(
+                    'Server-Timing',
+                    f'db;dur={queries.duration * 1000:.2f};desc="{queries.count} queries", app;dur={total:.2f}'
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_queries.reset(token)
+            name = route_name(scope)
+            route_queries.setdefault(name, RouteQueries()).add(queries, time.perf_counter() - started)
+            for shape, count in queries.repeated():
+                logger.warning("statement executed %d times in %s, likely N+1: %s", count, name, shape)
@@ -0,0 +1,50 @@
+import logging
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import Connection, select, func
+from sqlalchemy.ext.asyncio import AsyncEngine
+from settings import settings
+from .database import async_engine
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key shared by every worker of the project
+MIGRATION_LOCK_ID = 2_024_111_009
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    config = Config(str(settings.base_dir / 'alembic.ini'))
+    config.set_main_option('script_location', str(settings.base_dir / 'migrations'))
+    config.attributes['connection'] = connection
+    config.attributes['configure_logger'] = False
+    return config
+
+
+def _is_current(connection: Connection, heads: set[str]) -> bool:
+    return set(MigrationContext.configure(connection).get_current_heads()) == heads
+
+
+def _upgrade(connection: Connection) -> None:
+    command.upgrade(alembic_config(connection), 'head')
+
+
+async def migrate(engine: AsyncEngine = async_engine) -> bool:
+    """
+    Upgrades the database to head in-process. Workers that start together serialize on a
+    transaction scoped advisory lock; whoever gets it second only sees that the revision is current.
+    :return: True when this call applied migrations
+    """
+    heads = set(ScriptDirectory.from_config(alembic_config()).get_heads())
+    async with engine.connect() as connection:
+        if await connection.run_sync(_is_current, heads):
+            return False
+        await connection.rollback()
+        async with connection.begin():
+            await connection.execute(select(func.pg_advisory_xact_lock(MIGRATION_LOCK_ID)))
+            if await connection.run_sync(_is_current, heads):
+                return False
+            logger.info("upgrading database to %s", ', '.join(sorted(heads)))
+            await connection.run_sync(_upgrade)
+    return True
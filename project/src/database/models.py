@@ -1,17 +1,58 @@
+import logging
+import sys
+from typing import ClassVar
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import AbstractConcreteBase
-from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import Mapped, Session, ORMExecuteState, raiseload
+from settings import settings
 from .database import Base
 from .types import int_pk
 
+logger = logging.getLogger(__name__)
+
 
 class BaseModel(AbstractConcreteBase, Base):
     """
     - id : primary key for all nested models
     - __repr__ : base implementation for describing models
+    - __strict_loading__ : 'raise', 'warn' or 'off' for relationships of rows loaded by this model's queries,
+      settings.database.strict_loading by default
     """
     __abstract__ = True
+    __strict_loading__: ClassVar[str] = settings.database.strict_loading
 
     id: Mapped[int_pk]
 
     def __repr__(self) -> str:
         return f"<{self.__tablename__} (id={self.id})>"
+
+
+def _caller() -> str:
+    # walks the frames instead of extracting the whole stack, only the filename of each one is read
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if '/src/' in filename and '/src/database/' not in filename:
+            return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _strict_loading(orm_execute_state: ORMExecuteState):
+    if not orm_execute_state.is_select or orm_execute_state.is_column_load:
+        return
+    mappers = orm_execute_state.all_mappers
+    mode = getattr(mappers[0].class_, '__strict_loading__', 'off') if mappers else 'off'
+    if mode == 'off':
+        return
+    if orm_execute_state.lazy_loaded_from is not None:
+        logger.warning(
+            "lazy load of %s.%s at %s",
+            orm_execute_state.lazy_loaded_from.class_.__name__,
+            orm_execute_state.loader_strategy_path[-1].key,
+            _caller(),
+        )
+    elif mode == 'raise':
+        # relationships not loaded explicitly by the statement raise instead of emitting sql
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload('*', sql_only=True))
@@ -0,0 +1,77 @@
+import time
+from dataclasses import dataclass
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.metrics.metrics import (
+    db_pool_checkouts, db_pool_checkout_duration, db_pool_timeouts, db_pool_connect_errors, db_pool_checked_out
+)
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+    timeouts: int = 0
+    connect_errors: int = 0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that measures how long a checkout takes (waiting for a free
+    connection, opening a new one, pre-ping) and counts timeouts and connect errors,
+    in stats for this worker and in the prometheus metrics labelled with name.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self.name = 'default'
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.name = self.name
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            db_pool_timeouts.labels(self.name).inc()
+            raise
+        except Exception:
+            self.stats.connect_errors += 1
+            db_pool_connect_errors.labels(self.name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.checkouts += 1
+            self.stats.wait_time_total += elapsed
+            self.stats.wait_time_max = max(self.stats.wait_time_max, elapsed)
+            db_pool_checkouts.labels(self.name).inc()
+            db_pool_checkout_duration.labels(self.name).observe(elapsed)
+            db_pool_checked_out.labels(self.name).set(self.checkedout())
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        db_pool_checked_out.labels(self.name).set(self.checkedout())
+
+    def snapshot(self) -> dict:
+        """
+        :return: live numbers of this worker's pool
+        """
+        stats = self.stats
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': max(self.overflow(), 0),
+            'max_overflow': self._max_overflow,
+            'checkouts': stats.checkouts,
+            'wait_ms_avg': round(stats.wait_time_total / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            'wait_ms_max': round(stats.wait_time_max * 1000, 3),
+            'timeouts': stats.timeouts,
+            'connect_errors': stats.connect_errors,
+        }
@@ -0,0 +1,91 @@
+from typing import Any, Iterable
+from sqlalchemy import Table, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from .database import Base
+
+
+class Staged:
+    """
+    Row staged in a UnitOfWork. Values set on staging are readable right away,
+    the generated ones (id, defaults) after flush. Values may be other Staged rows, they are replaced by their id.
+    """
+    __slots__ = ('model', 'table', 'values', 'row')
+
+    def __init__(self, model: type[Base], values: dict[str, Any]) -> None:
+        self.model = model
+        self.table: Table = model.__table__
+        self.values = values
+        self.row: dict[str, Any] | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self.row is not None and name in self.row:
+            return self.row[name]
+        if name in self.values:
+            return self.values[name]
+        raise AttributeError(f"{self.table.name}.{name} is not known before flush")
+
+    def as_dict(self) -> dict[str, Any]:
+        return dict(self.row if self.row is not None else self.values)
+
+    def __repr__(self) -> str:
+        return f"<Staged {self.table.name} {self.as_dict()}>"
+
+
+class UnitOfWork:
+    """
+    Stages rows of several tables and writes them with one multi-row INSERT ... RETURNING per table,
+    parents before children, instead of add/commit/refresh per object.
+    Children reference their parents by the Staged row, the generated ids are filled in memory.
+
+        uow = UnitOfWork(session)
+        menu = uow.add(MenuModel, user_id=user_id, date=date, meal_time=meal_time)
+        uow.add_all(MenuItemModel, [{'menu_id': menu, 'product_id': product_id} for product_id in products])
+        await uow.commit()
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self._staged: dict[Table, list[Staged]] = {}
+
+    def add(self, model: type[Base], **values) -> Staged:
+        staged = Staged(model, values)
+        self._staged.setdefault(staged.table, []).append(staged)
+        return staged
+
+    def add_all(self, model: type[Base], rows: Iterable[dict[str, Any]]) -> list[Staged]:
+        return [self.add(model, **values) for values in rows]
+
+    async def flush(self) -> None:
+        """
+        Inserts everything staged so far inside the session's transaction
+        """
+        order = {table: i for i, table in enumerate(Base.metadata.sorted_tables)}
+        for table in sorted(self._staged, key=order.__getitem__):
+            rows = self._staged[table]
+            params = [
+                {key: value.id if isinstance(value, Staged) else value for key, value in staged.values.items()}
+                for staged in rows
+            ]
+            result = await self.session.execute(
+                insert(table).returning(*table.c, sort_by_parameter_order=True), params
+            )
+            for staged, row in zip(rows, result.mappings()):
+                staged.row = dict(row)
+        self._staged.clear()
+
+    def load(self, staged: Staged) -> Base:
+        """
+        :param staged: row written by flush
+        :return: the row as a model instance of the session, built from RETURNING without a query
+        """
+        if staged.row is None:
+            raise ValueError(f"{staged.table.name} row is not flushed")
+        instance = staged.model(**staged.row)
+        make_transient_to_detached(instance)
+        self.session.add(instance)
+        return instance
+
+    async def commit(self) -> None:
+        await self.flush()
+        await self.session.commit()
@@ -1,8 +1,33 @@
-from fastapi import APIRouter
+import os
+from fastapi import APIRouter, Depends, Response, status
+from src.auth.manager import get_current_admin
+from .database import async_engine, replicas
+from .instrumentation import route_queries
 
 router = APIRouter(prefix='/database', tags=['database'])
 
 
 @router.get('/')
-async def database():
-    return 'database'
+async def database(_=Depends(get_current_admin)):
+    return {
+        'pid': os.getpid(),
+        'pool': async_engine.pool.snapshot(),
+        'replicas': [
+            {**status, 'pool': engine.pool.snapshot()}
+            for status, engine in zip(replicas.status(), replicas.engines)
+        ],
+    }
+
+
+@router.get('/queries')
+async def get_queries(_=Depends(get_current_admin)):
+    return {
+        'pid': os.getpid(),
+        'routes': {name: stats.as_dict() for name, stats in sorted(route_queries.items())},
+    }
+
+
+@router.delete('/queries')
+async def reset_queries(response: Response, _=Depends(get_current_admin)):
+    route_queries.clear()
+    response.status_code = status.HTTP_204_NO_CONTENT
@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import time
+import uuid
+from dataclasses import dataclass, field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import ProductModel, ProductTypes, IngredientProductModel
+from .substitution import SubstitutionIndex
+from src.cache import cache
+
+CATALOG_TTL = 300
+VERSION_KEY = 'catalog:version'
+
+
+@dataclass
+class TypeProducts:
+    """
+    Products of one ProductTypes as parallel lists, position i describes one product
+    """
+    ids: list[int] = field(default_factory=list)
+    names: list[str] = field(default_factory=list)
+    calories: list[int] = field(default_factory=list)
+    prices: list[int] = field(default_factory=list)
+    ingredients: list[frozenset[int]] = field(default_factory=list)
+
+
+class Catalog:
+    """
+    Snapshot of the products used for menu generation, shared by the workers through the cache.
+    Each worker keeps the snapshot of the current version in memory; invalidate() starts a new version,
+    ttl covers changes made outside of the views. Without a shared cache other workers keep their snapshot
+    until ttl, generate_menu invalidates a snapshot whose products fail the foreign key of menu_items.
+    """
+
+    def __init__(self, ttl: float = CATALOG_TTL) -> None:
+        self.ttl = ttl
+        self._products: dict[ProductTypes, TypeProducts] | None = None
+        self._index: SubstitutionIndex | None = None
+        self._version: str | None = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, version: str) -> bool:
+        return (self._products is not None and self._version == version
+                and time.monotonic() - self._loaded_at < self.ttl)
+
+    async def get(self, session: AsyncSession) -> dict[ProductTypes, TypeProducts]:
+        version = await cache.get(VERSION_KEY, '0')
+        if self._is_fresh(version):
+            return self._products
+        async with self._lock:
+            if not self._is_fresh(version):
+                self._products = await cache.get_or_set(
+                    f'catalog:{version}', functools.partial(self._load, session), ttl=self.ttl
+                )
+                self._version = version
+                self._index = None
+                self._loaded_at = time.monotonic()
+        return self._products
+
+    async def get_index(self, session: AsyncSession) -> SubstitutionIndex:
+        products = await self.get(session)
+        if self._index is None or self._index.products is not products:
+            self._index = SubstitutionIndex(products)
+        return self._index
+
+    async def invalidate(self) -> None:
+        await cache.set(VERSION_KEY, uuid.uuid4().hex, ttl=None)
+        self._products = None
+        self._index = None
+
+    @staticmethod
+    async def _load(session: AsyncSession) -> dict[ProductTypes, TypeProducts]:
+        products: dict[ProductTypes, TypeProducts] = {product_type: TypeProducts() for product_type in ProductTypes}
+        ingredients: dict[int, set[int]] = {}
+        for product_id, ingredient_id in await session.execute(
+                select(IngredientProductModel.product_id, IngredientProductModel.ingredient_id)
+        ):
+            ingredients.setdefault(product_id, set()).add(ingredient_id)
+        rows = await session.execute(
+            select(ProductModel.id, ProductModel.name, ProductModel.type, ProductModel.calories, ProductModel.price)
+            .order_by(ProductModel.id)
+        )
+        for product_id, name, product_type, calories, price in rows:
+            of_type = products[product_type]
+            of_type.ids.append(product_id)
+            of_type.names.append(name)
+            of_type.calories.append(calories)
+            of_type.prices.append(price)
+            of_type.ingredients.append(frozenset(ingredients.get(product_id, ())))
+        return products
+
+
+catalog = Catalog()
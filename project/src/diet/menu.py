@@ -1,9 +1,39 @@
 import datetime
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from .models import ProductModel, ProductTypes
+from .models import ProductTypes
 from .models import MenuModel, MenuItemModel, MealTimes
 from src.auth.models import AccountModel
+from .shopping import menus_tag
+from .nutrition import add_daily_totals
+from .catalog import catalog
+from .variety import recent_products, sample_indexes
+from src.cache import cache
+from src.events import publish
+from src.database.uow import UnitOfWork
+
+# relative size of the meals of a day
+MEAL_WEIGHTS = {
+    MealTimes.BREAKFAST: 0.25,
+    MealTimes.SNACK: 0.1,
+    MealTimes.LUNCH: 0.3,
+    MealTimes.L_LUNCH: 0.2,
+    MealTimes.AFTERNOON: 0.1,
+    MealTimes.DINNER: 0.25,
+}
+# share of the daily calories target per meal time, a day of all meal times adds up to the target
+MEAL_SHARES = {meal_time: weight / sum(MEAL_WEIGHTS.values()) for meal_time, weight in MEAL_WEIGHTS.items()}
+
+
+def meal_calories(daily_calories: int, meal_time: MealTimes, tolerance: float = 0.25) -> tuple[int, int]:
+    """
+    :param daily_calories: user's daily target
+    :param meal_time: meal time of the menu
+    :param tolerance: allowed relative deviation
+    :return: (min, max) calories accepted by generate_menu
+    """
+    share = daily_calories * MEAL_SHARES[meal_time]
+    return round(share * (1 - tolerance)), round(share * (1 + tolerance))
 
 
 async def generate_menu(
@@ -13,39 +43,50 @@ async def generate_menu(
         calories: tuple[int, int],
         types_amount: dict[ProductTypes, int],
         session: AsyncSession
-) -> tuple:
+) -> tuple[MenuModel, list[tuple[int, int, int]]]:
     """
     :param user: that user who needs a menu
     :param meal_time: which meal time a menu takes
     :param date: that date user going to use this menu
     :param calories: tuple of min and max calories like (min, max)
     :param types_amount: amount of meals this menu takes
-    :param session: database session
-    :return: menu which includes products list for any meal time
+    :param session: database session, without uncommitted changes: a snapshot that lists a deleted product
+        rolls the transaction back and generates once more
+    :return: menu and its products as (id, calories, price)
     """
 
-    selected_products = []
-    total_calories = 0
-
-    for product_type, amount in types_amount.items():
-        if amount > 0:
-            query = (
-                select(ProductModel.id, ProductModel.calories)
-                .filter(ProductModel.type == product_type)
-                .order_by(func.random())
-                .limit(amount)
-            )
-            products = (await session.execute(query)).all()
-            selected_products.extend(products)
-            total_calories += sum(p[1] for p in products)
-    if not (calories[0] <= total_calories <= calories[1]):
-        raise ValueError("not found products for given amount of type")
-    menu = MenuModel(user_id=user.id, date=date, meal_time=meal_time)
-    session.add(menu)
-    await session.commit()
-    menu_items = []
-    for product in selected_products:
-        menu_items.append(MenuItemModel(menu_id=menu.id, product_id=product[0]))
-    session.add_all(menu_items)
+    user_id = user.id
+    recent = await recent_products(session, user_id, date)
+    for attempt in range(2):
+        selected_products = []
+        total_calories = 0
+        total_price = 0
+        products = await catalog.get(session)
+        for product_type, amount in types_amount.items():
+            if amount > 0:
+                of_type = products[product_type]
+                for i in sample_indexes(of_type.ids, amount, recent):
+                    selected_products.append((of_type.ids[i], of_type.calories[i], of_type.prices[i]))
+                    total_calories += of_type.calories[i]
+                    total_price += of_type.prices[i]
+        if not (calories[0] <= total_calories <= calories[1]):
+            raise ValueError("not found products for given amount of type")
+        uow = UnitOfWork(session)
+        staged = uow.add(MenuModel, user_id=user_id, date=date, meal_time=meal_time)
+        uow.add_all(MenuItemModel, [{'menu_id': staged, 'product_id': product[0]} for product in selected_products])
+        try:
+            await uow.flush()
+        except IntegrityError:
+            # the snapshot lists a deleted product, e.g. one deleted through another worker without a shared cache
+            await session.rollback()
+            if attempt:
+                raise
+            await catalog.invalidate()
+            continue
+        break
+    menu = uow.load(staged)
+    await add_daily_totals(session, user_id, date, total_calories, total_price, len(selected_products))
     await session.commit()
+    await cache.invalidate_tags(menus_tag(user_id))
+    await publish(user_id, 'menu.generated', menu_id=menu.id, date=date.isoformat(), meal_time=meal_time.value)
     return menu, selected_products
@@ -2,4 +2,5 @@ from .ingredients import *
 from .products import *
 from .m2m import *
 from .menu import *
-from .training import *
\ No newline at end of file
+from .training import *
+from .nutrition import *
\ No newline at end of file
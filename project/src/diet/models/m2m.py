@@ -1,6 +1,6 @@
 from src.database.models import BaseModel
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 
 
 class IngredientProductModel(BaseModel):
@@ -8,9 +8,13 @@ class IngredientProductModel(BaseModel):
 
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"))
     product: Mapped["ProductModel"] = relationship(back_populates="ingredients")
-    ingredient_id: Mapped[int] = mapped_column(ForeignKey("ingredients.id", ondelete="CASCADE"))
+    ingredient_id: Mapped[int] = mapped_column(ForeignKey("ingredients.id", ondelete="CASCADE"), index=True)
     ingredient: Mapped["IngredientModel"] = relationship(back_populates='products')
 
+    __table_args__ = (
+        Index('ix_ingredient_products_product_id_ingredient_id', 'product_id', 'ingredient_id'),
+    )
+
     def __str__(self):
         return f"<IngredientProductModel(product_id: {self.product_id}, ingredient_id: {self.ingredient_id})>"
 
@@ -2,7 +2,7 @@ import datetime
 from src.auth.models import AccountModel
 from src.database.models import BaseModel
 from sqlalchemy.orm import Mapped, mapped_column, relationship, backref
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from enum import Enum
 from .products import ProductModel
 
@@ -36,6 +36,10 @@ class MenuModel(BaseModel):
     user: Mapped[AccountModel] = relationship(backref="menus")
     items: Mapped[list["MenuItemModel"]] = relationship(back_populates="menu")
 
+    __table_args__ = (
+        Index('ix_menus_user_id_date', 'user_id', 'date'),
+    )
+
     def __str__(self):
         return f"<MenuModel(meal_time: {self.meal_time}, date: {self.date})>"
 
@@ -43,9 +47,9 @@ class MenuModel(BaseModel):
 class MenuItemModel(BaseModel):
     __tablename__ = 'menu_items'
 
-    menu_id: Mapped[int] = mapped_column(ForeignKey('menus.id', ondelete='CASCADE'))
+    menu_id: Mapped[int] = mapped_column(ForeignKey('menus.id', ondelete='CASCADE'), index=True)
     menu: Mapped[MenuModel] = relationship(back_populates="items")
-    product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'))
+    product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'), index=True)
     product: Mapped["ProductModel"] = relationship(backref="menu_items")
 
     def __str__(self):
@@ -0,0 +1,24 @@
+import datetime
+from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from src.database.models import BaseModel
+
+
+class DailyNutritionModel(BaseModel):
+    """
+    Planned totals of a user's menus per day, kept up to date by menu generation
+    """
+    __tablename__ = 'daily_nutrition'
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete='CASCADE'))
+    date: Mapped[datetime.date]
+    calories: Mapped[int] = mapped_column(default=0)
+    price: Mapped[int] = mapped_column(default=0)
+    items: Mapped[int] = mapped_column(default=0)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'date', name='uix_daily_nutrition_user_date'),
+    )
+
+    def __str__(self):
+        return f"<DailyNutritionModel(user_id: {self.user_id}, date: {self.date}, calories: {self.calories})>"
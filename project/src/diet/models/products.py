@@ -22,7 +22,7 @@ class ProductModel(BaseModel):
     description: Mapped[str_256] = mapped_column(nullable=True)
     ingredients: Mapped[list["IngredientProductModel"] | None] = relationship(back_populates="product")
     image: Mapped[str_256] = mapped_column(unique=True)
-    type: Mapped[ProductTypes]
+    type: Mapped[ProductTypes] = mapped_column(index=True)
     price: Mapped[int] = mapped_column(default=0)
     calories: Mapped[int]
 
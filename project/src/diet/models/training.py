@@ -34,7 +34,7 @@ class ConductedTrainingModel(BaseModel):
 
     training_id: Mapped[int] = mapped_column(ForeignKey('trainings.id', ondelete='CASCADE'))
     training: Mapped[TrainingModel] = relationship(back_populates='conducted_trainings')
-    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete='CASCADE'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete='CASCADE'), index=True)
     user: Mapped["AccountModel"] = relationship(backref='conducted_trainings')
 
     __table_args__ = (
@@ -0,0 +1,60 @@
+import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import DailyNutritionModel
+from .schemas import DailyNutritionSchema
+
+
+async def add_daily_totals(
+        session: AsyncSession,
+        user_id: int,
+        date: datetime.date,
+        calories: int,
+        price: int,
+        items: int
+) -> None:
+    """
+    Adds planned products to the user's row for that day, call it in the same transaction
+    that writes the menu_items.
+    """
+    stmt = insert(DailyNutritionModel).values(
+        user_id=user_id, date=date, calories=calories, price=price, items=items
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyNutritionModel.user_id, DailyNutritionModel.date],
+        set_={
+            'calories': DailyNutritionModel.calories + stmt.excluded.calories,
+            'price': DailyNutritionModel.price + stmt.excluded.price,
+            'items': DailyNutritionModel.items + stmt.excluded['items'],
+        }
+    )
+    await session.execute(stmt)
+
+
+async def get_daily_totals(
+        user_id: int,
+        start: datetime.date,
+        end: datetime.date,
+        session: AsyncSession
+) -> list[DailyNutritionSchema]:
+    """
+    :return: one row per day of [start, end], days without menus are zeros
+    """
+    rows = (await session.execute(
+        select(DailyNutritionModel.date, DailyNutritionModel.calories, DailyNutritionModel.price,
+               DailyNutritionModel.items)
+        .where(DailyNutritionModel.user_id == user_id, DailyNutritionModel.date.between(start, end))
+    )).all()
+    by_date = {row.date: row for row in rows}
+    result = []
+    for offset in range((end - start).days + 1):
+        day = start + datetime.timedelta(days=offset)
+        row = by_date.get(day)
+        result.append(DailyNutritionSchema(
+            date=day,
+            calories=row.calories if row else 0,
+            price=row.price if row else 0,
+            items=row.items if row else 0,
+        ))
+    return result
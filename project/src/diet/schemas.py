@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
 from .models import TrainingLevels, ProductTypes, AllergicIndexes, MealTimes
 from src.auth.schemas import User
 import datetime
@@ -10,6 +10,8 @@ class IngredientProductSchema(BaseModel):
 
 
 class IngredientSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     name: str
     calories_per_unit: int
     allergic_index: AllergicIndexes
@@ -17,6 +19,8 @@ class IngredientSchema(BaseModel):
 
 
 class ProductInSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     name: str
     description: str | None = None
     type: ProductTypes
@@ -27,22 +31,80 @@ class ProductInSchema(BaseModel):
 class ProductSchema(ProductInSchema):
     ingredients: list[IngredientSchema]
 
+    @field_validator('ingredients', mode='before')
+    @classmethod
+    def _ingredients(cls, value):
+        # ProductModel.ingredients holds IngredientProductModel rows
+        return [getattr(item, 'ingredient', item) for item in value]
+
 
 class ProductOutSchema(ProductSchema):
     image: str
 
 
 class TrainingSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     name: str
     video: str
     level: TrainingLevels
 
 
 class MenuItemSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     product: ProductSchema
 
 
 class MenuSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     meal_time: MealTimes
     date: datetime.date
     items: list[ProductInSchema]
+
+    @field_validator('items', mode='before')
+    @classmethod
+    def _items(cls, value):
+        # MenuModel.items holds MenuItemModel rows
+        return [getattr(item, 'product', item) for item in value]
+
+
+class ShoppingProductSchema(BaseModel):
+    id: int
+    name: str
+    count: int
+    calories: int
+    price: int
+
+
+class ShoppingIngredientSchema(BaseModel):
+    id: int
+    name: str
+    count: int
+    calories: int
+
+
+class ShoppingListSchema(BaseModel):
+    start: datetime.date
+    end: datetime.date
+    products: list[ShoppingProductSchema]
+    ingredients: list[ShoppingIngredientSchema]
+    total_calories: int
+    total_price: int
+
+
+class DailyNutritionSchema(BaseModel):
+    date: datetime.date
+    calories: int
+    price: int
+    items: int
+
+
+class SwapCandidateSchema(BaseModel):
+    id: int
+    name: str
+    type: ProductTypes
+    calories: int
+    price: int
+    distance: float
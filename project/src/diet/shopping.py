@@ -0,0 +1,96 @@
+import datetime
+import functools
+from sqlalchemy import select, func, distinct, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import MenuModel, MenuItemModel, ProductModel, IngredientProductModel, IngredientModel
+from .schemas import ShoppingListSchema, ShoppingProductSchema, ShoppingIngredientSchema
+from src.cache import cache
+
+SHOPPING_TTL = 60
+# every cached shopping list, dropped when products or ingredients change
+SHOPPING_TAG = 'shopping'
+
+
+def menus_tag(user_id: int) -> str:
+    """
+    Tag of everything derived from a user's menus, invalidated when one of them is written
+    """
+    return f'menus:{user_id}'
+
+
+async def build_shopping_list(
+        user_id: int,
+        start: datetime.date,
+        end: datetime.date,
+        session: AsyncSession
+) -> ShoppingListSchema:
+    """
+    Shopping list of the menus in [start, end], cached for SHOPPING_TTL seconds
+    :param user_id: owner of the menus
+    :param start: first date, inclusive
+    :param end: last date, inclusive
+    :param session: database session
+    """
+    return await cache.get_or_set(
+        f'shopping:{user_id}:{start}:{end}',
+        functools.partial(_query_shopping_list, user_id, start, end, session),
+        ttl=SHOPPING_TTL,
+        tags=(menus_tag(user_id), SHOPPING_TAG),
+    )
+
+
+async def _query_shopping_list(
+        user_id: int,
+        start: datetime.date,
+        end: datetime.date,
+        session: AsyncSession
+) -> ShoppingListSchema:
+    """
+    One aggregate over menus -> menu_items -> products -> ingredient_products -> ingredients,
+    grouped by product and by ingredient with GROUPING SETS.
+    """
+    count = func.count(distinct(MenuItemModel.id))
+    query = (
+        select(
+            func.grouping(IngredientModel.id).label('by_product'),
+            ProductModel.id.label('product_id'),
+            ProductModel.name.label('product_name'),
+            IngredientModel.id.label('ingredient_id'),
+            IngredientModel.name.label('ingredient_name'),
+            count.label('count'),
+            (count * func.max(ProductModel.calories)).label('product_calories'),
+            (count * func.max(ProductModel.price)).label('product_price'),
+            (count * func.max(IngredientModel.calories_per_unit)).label('ingredient_calories'),
+        )
+        .select_from(MenuModel)
+        .join(MenuItemModel, MenuItemModel.menu_id == MenuModel.id)
+        .join(ProductModel, ProductModel.id == MenuItemModel.product_id)
+        .outerjoin(IngredientProductModel, IngredientProductModel.product_id == ProductModel.id)
+        .outerjoin(IngredientModel, IngredientModel.id == IngredientProductModel.ingredient_id)
+        .where(MenuModel.user_id == user_id, MenuModel.date.between(start, end))
+        .group_by(func.grouping_sets(
+            tuple_(ProductModel.id, ProductModel.name),
+            tuple_(IngredientModel.id, IngredientModel.name),
+        ))
+    )
+    products, ingredients = [], []
+    for row in await session.execute(query):
+        if row.by_product:
+            products.append(ShoppingProductSchema(
+                id=row.product_id, name=row.product_name, count=row.count,
+                calories=row.product_calories, price=row.product_price,
+            ))
+        elif row.ingredient_id is not None:
+            ingredients.append(ShoppingIngredientSchema(
+                id=row.ingredient_id, name=row.ingredient_name, count=row.count,
+                calories=row.ingredient_calories,
+            ))
+
+    return ShoppingListSchema(
+        start=start,
+        end=end,
+        products=products,
+        ingredients=ingredients,
+        total_calories=sum(p.calories for p in products),
+        total_price=sum(p.price for p in products),
+    )
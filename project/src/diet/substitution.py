@@ -0,0 +1,101 @@
+from collections.abc import Collection
+from typing import TYPE_CHECKING
+from .models import ProductTypes
+
+if TYPE_CHECKING:
+    from .catalog import TypeProducts
+
+# neighbours by calories on each side ranked first, the window doubles until no product outside it can rank higher
+WINDOW = 32
+OVERLAP_WEIGHT = 1.0
+
+
+class _TypeIndex:
+    """
+    Feature matrix of one product type sorted by calories
+    """
+
+    def __init__(self, products: "TypeProducts") -> None:
+        import numpy as np
+        self.products = products
+        calories = np.asarray(products.calories, dtype=float)
+        prices = np.asarray(products.prices, dtype=float)
+        self.order = np.argsort(calories, kind='stable')
+        # columns: calories, price scaled to unit deviation so both weigh the same
+        features = np.column_stack((calories, prices))[self.order]
+        scale = features.std(axis=0) if len(features) else np.ones(2)
+        scale[scale == 0] = 1
+        self.features = features / scale
+        self.sorted_calories = self.features[:, 0]
+        self.position = np.empty_like(self.order)
+        self.position[self.order] = np.arange(len(self.order))
+
+
+class SubstitutionIndex:
+    """
+    Nearest products of the same type by calories, price and ingredient overlap.
+    Built from a catalog snapshot; a lookup is a binary search plus ranking a window of neighbours by calories.
+    """
+
+    def __init__(self, products: dict[ProductTypes, "TypeProducts"]) -> None:
+        self.products = products
+        self._types = {product_type: _TypeIndex(of_type) for product_type, of_type in products.items()}
+        self._location: dict[int, tuple[ProductTypes, int]] = {
+            product_id: (product_type, i)
+            for product_type, of_type in products.items()
+            for i, product_id in enumerate(of_type.ids)
+        }
+
+    def locate(self, product_id: int) -> tuple[ProductTypes, int]:
+        """
+        :return: type and catalog position of the product, KeyError when it is not in the snapshot
+        """
+        return self._location[product_id]
+
+    def nearest(
+            self, product_id: int, limit: int = 5, exclude: Collection[int] = frozenset()
+    ) -> list[tuple[int, float]]:
+        """
+        :param product_id: product to replace
+        :param limit: max amount of alternatives
+        :param exclude: product ids that must not be suggested
+        :return: (catalog position, distance) pairs of the product's type, closest first
+        """
+        import numpy as np
+        product_type, i = self.locate(product_id)
+        index = self._types[product_type]
+        target = index.features[index.position[i]]
+        center = int(np.searchsorted(index.sorted_calories, target[0]))
+        size = len(index.order)
+        window = WINDOW
+        while True:
+            low, high = max(center - window, 0), min(center + window + 1, size)
+            result = self._rank(index, i, target, low, high, exclude)
+            # a distance is at least the calories gap, so products outside the window rank after `gap`
+            gap = min(
+                target[0] - index.sorted_calories[low - 1] if low > 0 else np.inf,
+                index.sorted_calories[high] - target[0] if high < size else np.inf,
+            )
+            if gap == np.inf or limit < 1 or (len(result) >= limit and result[limit - 1][1] <= gap):
+                return result[:limit]
+            window *= 2
+
+    @staticmethod
+    def _rank(
+            index: _TypeIndex, i: int, target, low: int, high: int, exclude: Collection[int]
+    ) -> list[tuple[int, float]]:
+        import numpy as np
+        of_type = index.products
+        distances = np.linalg.norm(index.features[low:high] - target, axis=1)
+        ingredients = of_type.ingredients[i]
+        result = []
+        for offset in range(high - low):
+            j = int(index.order[low + offset])
+            if j == i or of_type.ids[j] in exclude:
+                continue
+            other = of_type.ingredients[j]
+            union = len(ingredients | other)
+            overlap = len(ingredients & other) / union if union else 1.0
+            result.append((j, float(distances[offset]) + OVERLAP_WEIGHT * (1 - overlap)))
+        result.sort(key=lambda item: item[1])
+        return result
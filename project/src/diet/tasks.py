@@ -0,0 +1,57 @@
+import datetime
+import logging
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings import settings
+from src.auth.models import AccountModel
+from src.jobs.queue import job
+from .models import MealTimes, ProductTypes, MenuModel
+from .menu import generate_menu, meal_calories
+
+logger = logging.getLogger(__name__)
+
+FIRST_MENU_TYPES = {
+    ProductTypes.FOOD: 1,
+    ProductTypes.FRUIT: 2,
+    ProductTypes.DAIRY: 1
+}
+
+
+@job('diet.first_menu')
+async def first_menu(session: AsyncSession, user_id: int, daily_calories: int, date: str) -> None:
+    """
+    Breakfast of the day a user registered
+    """
+    user = await session.get(AccountModel, user_id)
+    if user is None:
+        return
+    date = datetime.date.fromisoformat(date)
+    # an earlier attempt may have committed the menu and died before the job was marked done
+    if await session.scalar(select(MenuModel.id).where(
+            MenuModel.user_id == user_id, MenuModel.date == date, MenuModel.meal_time == MealTimes.BREAKFAST
+    ).limit(1)) is not None:
+        return
+    try:
+        await generate_menu(
+            user,
+            meal_time=MealTimes.BREAKFAST,
+            date=date,
+            calories=meal_calories(daily_calories, MealTimes.BREAKFAST),
+            types_amount=FIRST_MENU_TYPES,
+            session=session,
+        )
+    except ValueError as err:
+        # the catalog has no fitting products, retrying would not change that
+        logger.info("no first menu for user %s: %s", user_id, err)
+
+
+@job('diet.delete_image')
+async def delete_image(session: AsyncSession, image: str) -> None:
+    """
+    Removes the file of a deleted product
+    :param image: url stored in ProductModel.image
+    """
+    name = image.rsplit('/', 1)[-1]
+    if name in ('', '.', '..'):
+        return
+    (settings.media.root / 'images' / name).unlink(missing_ok=True)
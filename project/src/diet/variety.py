@@ -0,0 +1,54 @@
+import datetime
+import random
+from collections.abc import Container
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import MenuModel, MenuItemModel
+
+RECENT_DAYS = 7
+
+
+async def recent_products(session: AsyncSession, user_id: int, date: datetime.date, days: int = RECENT_DAYS) -> set[int]:
+    """
+    :param session: database session
+    :param user_id: owner of the menus
+    :param date: date of the menu being generated
+    :param days: calendar days around `date` that count as recent
+    :return: ids of the products of the user's menus less than `days` days away from `date`
+    """
+    delta = datetime.timedelta(days=days - 1)
+    return set(await session.scalars(
+        select(MenuItemModel.product_id).distinct()
+        .join(MenuModel, MenuItemModel.menu_id == MenuModel.id)
+        .where(MenuModel.user_id == user_id, MenuModel.date.between(date - delta, date + delta))
+    ))
+
+
+def sample_indexes(
+        ids: list[int],
+        amount: int,
+        recent: Container[int],
+        rnd: random.Random | None = None
+) -> list[int]:
+    """
+    Picks `amount` random positions of `ids` preferring products outside `recent`.
+    Rejection sampling costs O(amount) while most of the catalog is not recent;
+    falls back to a scan, and finally to recent products, when it is.
+    """
+    rnd = rnd or random
+    size = len(ids)
+    if amount >= size:
+        return list(range(size))
+    chosen: set[int] = set()
+    for _ in range(amount * 8):
+        index = rnd.randrange(size)
+        if index not in chosen and ids[index] not in recent:
+            chosen.add(index)
+            if len(chosen) == amount:
+                return list(chosen)
+    fresh = [i for i in range(size) if i not in chosen and ids[i] not in recent]
+    chosen.update(rnd.sample(fresh, min(amount - len(chosen), len(fresh))))
+    if len(chosen) < amount:
+        rest = [i for i in range(size) if i not in chosen]
+        chosen.update(rnd.sample(rest, amount - len(chosen)))
+    return list(chosen)
@@ -0,0 +1,140 @@
+import mimetypes
+import mmap
+import os
+import pathlib
+from email.utils import formatdate
+from fastapi import HTTPException, status
+from starlette.responses import Response, RedirectResponse
+from starlette.types import Scope, Receive, Send
+from settings import settings
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    :param header: value of the Range header
+    :param size: size of the file in bytes
+    :return: inclusive (start, end) pair, or None when the whole file should be sent
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        # multipart ranges are not worth it for video players, RFC 9110 allows ignoring them
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if not first:
+            length = int(last)
+            if length < 0:
+                raise ValueError
+            if length == 0:
+                # an empty suffix selects no bytes, RFC 9110 14.1.1
+                raise _unsatisfiable(size)
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise _unsatisfiable(size)
+    return start, end
+
+
+def _unsatisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        headers={'Content-Range': f'bytes */{size}'},
+    )
+
+
+class VideoResponse(Response):
+    """
+    Sends [start, end] of a file.
+
+    Uses the ASGI zerocopysend extension (os.sendfile) when the server offers it,
+    otherwise the file is memory-mapped and sent in fixed chunks, so no worker thread
+    is needed per chunk and the page cache is shared between all workers.
+    """
+
+    def __init__(
+            self,
+            path: pathlib.Path,
+            stat: os.stat_result,
+            byte_range: tuple[int, int] | None,
+            etag: str,
+            chunk_size: int = settings.media.chunk_size,
+    ) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        size = stat.st_size
+        self.start, self.end = byte_range or (0, size - 1)
+        headers = {
+            'accept-ranges': 'bytes',
+            'content-length': str(self.end - self.start + 1),
+            'last-modified': formatdate(stat.st_mtime, usegmt=True),
+            'etag': etag,
+        }
+        if byte_range:
+            headers['content-range'] = f'bytes {self.start}-{self.end}/{size}'
+        super().__init__(
+            status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            headers=headers,
+            media_type=mimetypes.guess_type(path.name)[0] or 'video/mp4',
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        if scope['method'] == 'HEAD' or self.end < self.start:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return
+        if 'http.response.zerocopysend' in scope.get('extensions', {}):
+            with open(self.path, 'rb') as file:
+                await send({
+                    'type': 'http.response.zerocopysend',
+                    'file': file,
+                    'offset': self.start,
+                    'count': self.end - self.start + 1,
+                    'more_body': False,
+                })
+            return
+        with open(self.path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            position = self.start
+            while position <= self.end:
+                chunk_end = min(position + self.chunk_size, self.end + 1)
+                await send({
+                    'type': 'http.response.body',
+                    'body': mm[position:chunk_end],
+                    'more_body': chunk_end <= self.end,
+                })
+                position = chunk_end
+
+
+def video_response(video: str, range_header: str | None, if_range: str | None) -> Response:
+    """
+    :param video: TrainingModel.video, either an url or a path relative to media root
+    :param range_header: value of the Range header
+    :param if_range: value of the If-Range header
+    :return: redirect for remote videos, nginx offload or a streamed response for local ones
+    """
+    if video.startswith(('http://', 'https://')):
+        return RedirectResponse(video)
+    root = settings.media.root.resolve()
+    path = (root / video.lstrip('/')).resolve()
+    if not path.is_relative_to(root) or not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Video not found')
+
+    if settings.media.accel_redirect:
+        # nginx serves the body with sendfile and handles Range itself
+        return Response(
+            headers={'X-Accel-Redirect': settings.media.accel_prefix + path.relative_to(root).as_posix()},
+            media_type=mimetypes.guess_type(path.name)[0] or 'video/mp4',
+        )
+
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    byte_range = parse_range(range_header, stat.st_size) if not if_range or if_range == etag else None
+    return VideoResponse(path, stat, byte_range, etag)
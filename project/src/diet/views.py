@@ -1,17 +1,39 @@
-from fastapi import APIRouter, Depends, Path, HTTPException, status, Response, File, UploadFile, Form
+import datetime
+import logging
+from fastapi import APIRouter, Depends, Path, HTTPException, status, Response, File, UploadFile, Form, Header, Query
 from sqlalchemy.exc import IntegrityError
-from .schemas import ProductSchema, IngredientSchema, ProductOutSchema, MenuSchema, MenuItemSchema
+from .schemas import ProductSchema, IngredientSchema, ProductOutSchema, MenuSchema, ShoppingListSchema
+from .schemas import DailyNutritionSchema, SwapCandidateSchema
 from .models import ProductModel, IngredientModel, IngredientProductModel, ProductTypes, MenuModel, MenuItemModel
+from .models import TrainingModel
+from .video import video_response
+from .shopping import build_shopping_list, menus_tag, SHOPPING_TAG
+from .nutrition import get_daily_totals
+from .catalog import catalog
+from .tasks import delete_image
 from sqlalchemy.orm import selectinload
 from sqlalchemy import select, delete
-from src.database.database import get_session, AsyncSession
+from src.database.database import get_session, get_read_session, AsyncSession
+from src.database.uow import UnitOfWork
 from src.auth.manager import UserManager
 from src.auth.models import SessionModel
-import aiofiles
+from src.cache import cached, cache
+from src.responses import SchemaResponse, dump_json
+from src.etag import etag_route
 from settings import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix='/diet', tags=['diet'])
 
+PRODUCTS_TAG = 'products'
+INGREDIENTS_TAG = 'ingredients'
+# longest date range of /shopping-list and /nutrition, both aggregate every day of it
+MAX_RANGE_DAYS = 366
+
+etag_route(f'{router.prefix}/ingredients', tags=lambda user_id: (INGREDIENTS_TAG,))
+etag_route(f'{router.prefix}/menu', tags=lambda user_id: (menus_tag(user_id), PRODUCTS_TAG))
+
 def err_response(err):
     field = str(err.orig).split('.')[-1]
     if not field:
@@ -31,25 +53,19 @@ def err_response(err):
     )
 
 
-@router.get('/products', response_model=list[ProductOutSchema])
-async def get_products(session: AsyncSession = Depends(get_session), _: bool = Depends(UserManager.verify_user)):
+@cached(key=lambda session: 'diet:products', ttl=300, tags=lambda session: (PRODUCTS_TAG,))
+async def products_json(session: AsyncSession) -> bytes:
     products = ((await session.execute(
         select(ProductModel)
         .options(selectinload(ProductModel.ingredients).selectinload(IngredientProductModel.ingredient))))
          .scalars().all()
          )
+    return dump_json(list[ProductOutSchema], products)
+
 
-    return [ProductOutSchema(
-        name=p.name, description=p.description, price=p.price,
-        calories=p.calories, type=p.type.value, image=p.image,
-        ingredients=map(
-            lambda x: IngredientSchema(
-                name=x.ingredient.name,
-                calories_per_unit=x.ingredient.calories_per_unit,
-                allergic_index=x.ingredient.allergic_index,
-                allergic_percentage=x.ingredient.allergic_percentage
-            ), p.ingredients
-        )) for p in products]
+@router.get('/products', response_model=list[ProductOutSchema])
+async def get_products(session: AsyncSession = Depends(get_read_session), _: bool = Depends(UserManager.verify_user)):
+    return Response(await products_json(session), media_type='application/json')
 
 
 @router.post('/products', response_model=ProductOutSchema)
@@ -78,6 +94,9 @@ async def add_product(
         await session.commit()
     except IntegrityError as err:
         err_response(err)
+    await cache.invalidate_tags(PRODUCTS_TAG)
+    await catalog.invalidate()
+    import aiofiles
     async with aiofiles.open(file_location, 'wb') as file:
         while content := await image.read(1024):
             await file.write(content)
@@ -96,7 +115,7 @@ async def add_product(
 @router.get('/products/{id}', response_model=ProductSchema)
 async def get_product(
         product_id: int = Path(alias='id'),
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
         _: bool = Depends(UserManager.verify_user)
 ):
     p = ((await session.execute(
@@ -107,20 +126,7 @@ async def get_product(
                )
     if not p:
         raise HTTPException(status_code=404, detail='Product not found')
-    return ProductSchema(
-        name=p.name,
-        description=p.description,
-        calories=p.calories,
-        price=p.price,
-        type=p.type,
-        ingredients=map(lambda x: IngredientSchema(
-            name=x.ingredient.name,
-            calories_per_unit=x.ingredient.calories_per_unit,
-            allergic_index=x.ingredient.allergic_index,
-            allergic_percentage=x.ingredient.allergic_percentage),
-            p.ingredients
-        )
-    )
+    return SchemaResponse(ProductSchema, p)
 
 
 @router.post('/products/{id}', response_model=ProductSchema)
@@ -135,18 +141,18 @@ async def add_ingredient2product(
         p = await session.get(ProductModel, product_id)
         if not p:
             raise HTTPException(status_code=404, detail='Product not found')
-        result = list(map(lambda x: IngredientModel(**x.model_dump()), ingredients))
-        session.add_all(result)
-        await session.commit()
-        session.add_all(map(lambda x: IngredientProductModel(product_id=product_id, ingredient_id=x.id), result))
-        await session.commit()
-        product = await session.get(ProductModel, product_id)
+        uow = UnitOfWork(session)
+        result = uow.add_all(IngredientModel, [x.model_dump() for x in ingredients])
+        uow.add_all(IngredientProductModel, [{'product_id': product_id, 'ingredient_id': x} for x in result])
+        await uow.commit()
+        await cache.invalidate_tags(SHOPPING_TAG, PRODUCTS_TAG, INGREDIENTS_TAG)
+        await catalog.invalidate()
         return ProductSchema(
-            name=product.name,
-            description=product.description,
-            type=product.type,
-            price=product.price,
-            calories=product.calories,
+            name=p.name,
+            description=p.description,
+            type=p.type,
+            price=p.price,
+            calories=p.calories,
             ingredients=ingredients)
     except IntegrityError as err:
         err_response(err)
@@ -161,10 +167,16 @@ async def delete_product(
         _: bool = Depends(UserManager.verify_user)
 ):
     try:
-        await session.execute(delete(ProductModel).where(ProductModel.id == product_id))
+        image = (await session.execute(
+            delete(ProductModel).where(ProductModel.id == product_id).returning(ProductModel.image)
+        )).scalar()
+        if image is not None:
+            await delete_image.enqueue(session, image=image)
         await session.commit()
+        await cache.invalidate_tags(SHOPPING_TAG, PRODUCTS_TAG)
+        await catalog.invalidate()
     except Exception as err:
-        print(type(err), err)
+        logger.warning("delete of product %s failed: %r", product_id, err)
         raise HTTPException(status.HTTP_400_BAD_REQUEST)
     response.status_code = status.HTTP_204_NO_CONTENT
 
@@ -182,6 +194,7 @@ async def add_ingredient(
         await session.commit()
     except IntegrityError as err:
         err_response(err)
+    await cache.invalidate_tags(INGREDIENTS_TAG)
 
 
 @router.delete('/ingredient/{id}')
@@ -195,13 +208,15 @@ async def delete_ingredient(
     try:
         await session.execute(delete(IngredientModel).where(IngredientModel.id == ingredient_id))
         await session.commit()
+        await cache.invalidate_tags(SHOPPING_TAG, PRODUCTS_TAG, INGREDIENTS_TAG)
+        await catalog.invalidate()
     except Exception as err:
-        print(type(err), err)
+        logger.warning("delete of ingredient %s failed: %r", ingredient_id, err)
         raise HTTPException(status.HTTP_400_BAD_REQUEST)
     response.status_code = status.HTTP_204_NO_CONTENT
 
 
-@router.put('/products/{id}', response_model=list[ProductSchema])
+@router.put('/products/{id}', response_model=ProductSchema)
 async def update_product(
         *,
         product_id: int = Path(alias='id'),
@@ -216,55 +231,112 @@ async def update_product(
         result = (await session.execute(select(IngredientModel.id).where(IngredientModel.name.in_(ingredients)))).scalars().all()
         session.add_all(map(lambda x: IngredientProductModel(product_id=product_id, ingredient_id=x), result))
         await session.commit()
+        await cache.invalidate_tags(SHOPPING_TAG, PRODUCTS_TAG)
+        await catalog.invalidate()
         product = ((await session.execute(
             select(ProductModel)
             .where(ProductModel.id == product_id)
             .options(selectinload(ProductModel.ingredients).selectinload(IngredientProductModel.ingredient))))
              .scalars().one_or_none()
              )
-        return ProductSchema(
-            name=product.name,
-            description=product.description,
-            type=product.type,
-            price=product.price,
-            calories=product.calories,
-            ingredients=map(lambda x: IngredientSchema(
-                name=x.ingredient.name,
-                calories_per_unit=x.ingredient.calories_per_unit,
-                allergic_index=x.ingredient.allergic_index,
-                allergic_percentage=x.ingredient.allergic_percentage),
-                product.ingredients
-            )
-        )
+        return SchemaResponse(ProductSchema, product)
     except IntegrityError as err:
         err_response(err)
 
 
-@router.get('/ingredients', response_model=list[IngredientSchema])
-async def get_ingredients(session: AsyncSession = Depends(get_session), _: bool = Depends(UserManager.verify_user)):
+@cached(key=lambda session: 'diet:ingredients', ttl=300, tags=lambda session: (INGREDIENTS_TAG,))
+async def ingredients_json(session: AsyncSession) -> bytes:
     ingredients = (await session.execute(select(IngredientModel))).scalars().all()
-    return [
-        IngredientSchema(
-            name=i.name,
-            calories_per_unit=i.calories_per_unit,
-            allergic_index=i.allergic_index,
-            allergic_percentage=i.allergic_percentage
-        )
-        for i in ingredients
-    ]
+    return dump_json(list[IngredientSchema], ingredients)
+
+
+@router.get('/ingredients', response_model=list[IngredientSchema])
+async def get_ingredients(session: AsyncSession = Depends(get_read_session), _: bool = Depends(UserManager.verify_user)):
+    return Response(await ingredients_json(session), media_type='application/json')
 
 
 @router.get('/menu', response_model=list[MenuSchema])
 async def get_menu(
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
         user_session: SessionModel = Depends(UserManager.get_current_user)
 ):
     menus = (await session.execute(
         select(MenuModel)
         .where(MenuModel.user_id == user_session.user.id)
         .options(selectinload(MenuModel.items).selectinload(MenuItemModel.product)))).scalars().all()
-    return [MenuSchema(
-        meal_time=menu.meal_time,
-        date=menu.date,
-        items=[MenuItemSchema(product=m.product) for m in menu.items]
-    ) for menu in menus]
+    return SchemaResponse(list[MenuSchema], menus)
+
+
+@router.get('/shopping-list', response_model=ShoppingListSchema)
+async def get_shopping_list(
+        start: datetime.date | None = Query(default=None),
+        end: datetime.date | None = Query(default=None),
+        session: AsyncSession = Depends(get_read_session),
+        user_session: SessionModel = Depends(UserManager.get_current_user)
+):
+    start = start or datetime.date.today()
+    end = end or start + datetime.timedelta(days=6)
+    if end < start:
+        raise HTTPException(status_code=400, detail='end must not be before start')
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f'the range may span at most {MAX_RANGE_DAYS} days')
+    return SchemaResponse(ShoppingListSchema, await build_shopping_list(user_session.user_id, start, end, session))
+
+
+@router.get('/nutrition', response_model=list[DailyNutritionSchema])
+async def get_nutrition(
+        start: datetime.date | None = Query(default=None),
+        end: datetime.date | None = Query(default=None),
+        session: AsyncSession = Depends(get_read_session),
+        user_session: SessionModel = Depends(UserManager.get_current_user)
+):
+    start = start or datetime.date.today()
+    end = end or start
+    if end < start or (end - start).days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail='invalid date range')
+    return SchemaResponse(list[DailyNutritionSchema], await get_daily_totals(user_session.user_id, start, end, session))
+
+
+@router.get('/trainings/{id}/video')
+async def get_training_video(
+        training_id: int = Path(alias='id'),
+        range_header: str | None = Header(default=None, alias='Range'),
+        if_range: str | None = Header(default=None, alias='If-Range'),
+        session: AsyncSession = Depends(get_read_session),
+        _: bool = Depends(UserManager.verify_user)
+):
+    video = (await session.execute(select(TrainingModel.video).where(TrainingModel.id == training_id))).scalar()
+    if not video:
+        raise HTTPException(status_code=404, detail='Training not found')
+    return video_response(video, range_header, if_range)
+
+
+@router.get('/menu/{id}/swap/{product_id}', response_model=list[SwapCandidateSchema])
+async def get_swap_candidates(
+        menu_id: int = Path(alias='id'),
+        product_id: int = Path(),
+        limit: int = Query(default=5, ge=1, le=20),
+        session: AsyncSession = Depends(get_read_session),
+        user_session: SessionModel = Depends(UserManager.get_current_user)
+):
+    in_menu = (await session.execute(
+        select(MenuItemModel.product_id)
+        .join(MenuModel, MenuModel.id == MenuItemModel.menu_id)
+        .where(MenuModel.id == menu_id, MenuModel.user_id == user_session.user_id)
+    )).scalars().all()
+    if product_id not in in_menu:
+        raise HTTPException(status_code=404, detail='Product not found in menu')
+    index = await catalog.get_index(session)
+    try:
+        nearest = index.nearest(product_id, limit=limit, exclude=set(in_menu))
+    except KeyError:
+        raise HTTPException(status_code=404, detail='Product not found')
+    product_type, _ = index.locate(product_id)
+    of_type = index.products[product_type]
+    return SchemaResponse(list[SwapCandidateSchema], [
+        SwapCandidateSchema(
+            id=of_type.ids[i], name=of_type.names[i], type=product_type,
+            calories=of_type.calories[i], price=of_type.prices[i], distance=distance,
+        )
+        for i, distance in nearest
+    ])
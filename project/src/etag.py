@@ -0,0 +1,163 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Iterable
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from src.auth.manager import UserManager
+from src.cache import cache
+
+
+@dataclass
+class ETagRule:
+    """
+    Conditional GET of one route.
+    Without tags the 200 body is hashed: a match saves the bandwidth only.
+    With tags the ETag is built from the cache versions of the tags of the token's user and checked
+    before the handler runs, after one lookup of the token's session, so a match saves the queries
+    of the handler and the rendering. The tags must be invalidated after every commit that changes
+    the body; with replicas a body rendered within the replication lag can carry the new version
+    until the next invalidation.
+    """
+    path: str
+    tags: Callable[[int], Iterable[str]] | None = None
+    cache_control: str = 'private, no-cache'
+    vary: str = 'Authorization'
+
+    def __post_init__(self) -> None:
+        self.regex = compile_path(self.path)[0]
+
+    async def version(self, headers: Headers) -> str | None:
+        """
+        :return: None when the body has to be hashed: no tags, a per process cache, no valid token
+            or a token whose session is closed, the handler answers those
+        """
+        if self.tags is None or not cache.shared:
+            return None
+        scheme, _, token = (headers.get('authorization') or '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return None
+        user = await UserManager.get_session_user(token)
+        if user is None:
+            return None
+        versions = [await cache.version(tag) for tag in self.tags(user.id)]
+        if None in versions:
+            return None
+        return f"{user.id}:{':'.join(versions)}"
+
+    def apply(self, headers: MutableHeaders, etag: str) -> None:
+        headers['ETag'] = etag
+        headers['Cache-Control'] = self.cache_control
+        if self.vary:
+            headers.add_vary_header(self.vary)
+
+
+etag_rules: list[ETagRule] = []
+
+
+def etag_route(
+        path: str,
+        tags: Callable[[int], Iterable[str]] | None = None,
+        cache_control: str = 'private, no-cache',
+        vary: str = 'Authorization'
+) -> None:
+    """
+    :param path: route path with the router prefix, e.g. '/diet/menu'
+    :param tags: called with the user id of the token, returns the cache tags the body depends on
+    :param cache_control: Cache-Control of 200 and 304 responses
+    :param vary: request header the body depends on, added to Vary
+    """
+    etag_rules.append(ETagRule(path, tags, cache_control, vary))
+
+
+def make_etag(*parts: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+        digest.update(b'\0')
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """
+    Weak comparison of RFC 9110 13.1.2
+    """
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+class ETagMiddleware:
+    """
+    Adds ETag/Cache-Control/Vary to 200 responses of GET routes registered with etag_route
+    and answers a matching If-None-Match with 304.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        rule = self._rule(scope)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if_none_match = headers.get('if-none-match')
+        version = await rule.version(headers)
+        if version is None:
+            await self.app(scope, receive, self._hashing(rule, if_none_match, send))
+            return
+        etag = make_etag(scope['path'].encode(), scope['query_string'], version.encode())
+        if if_none_match and etag_matches(etag, if_none_match):
+            message = {'type': 'http.response.start', 'status': 304, 'headers': []}
+            rule.apply(MutableHeaders(scope=message), etag)
+            await send(message)
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        async def send_with_etag(message: Message) -> None:
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                rule.apply(MutableHeaders(scope=message), etag)
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+    @staticmethod
+    def _rule(scope: Scope) -> ETagRule | None:
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return None
+        for rule in etag_rules:
+            if rule.regex.match(scope['path']):
+                return rule
+        return None
+
+    @staticmethod
+    def _hashing(rule: ETagRule, if_none_match: str | None, send: Send) -> Send:
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def send_hashed(message: Message) -> None:
+            nonlocal start
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                start = message
+                return
+            if start is None or message['type'] != 'http.response.body':
+                await send(message)
+                return
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+            body = b''.join(chunks)
+            etag = make_etag(body)
+            headers = MutableHeaders(scope=start)
+            rule.apply(headers, etag)
+            if if_none_match and etag_matches(etag, if_none_match):
+                del headers['content-length']
+                del headers['content-type']
+                await send({**start, 'status': 304})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+        return send_hashed
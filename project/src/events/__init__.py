@@ -0,0 +1 @@
+from .broker import MemoryBroker, RedisBroker, broker, publish
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+import orjson
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# seconds before a lost redis subscription is tried again
+RECONNECT_DELAY = 1
+
+
+class MemoryBroker:
+    """
+    Events of one process delivered to the websockets of the same process, used when no redis is configured
+    and in tests. Every websocket has a bounded queue, a slow client loses its oldest events.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self._queues: dict[int, set[asyncio.Queue]] = {}
+
+    async def publish(self, user_id: int, event: dict[str, Any]) -> None:
+        self._deliver(user_id, event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """
+        :return: queue of the events of user_id published while the context is open
+        """
+        queue = asyncio.Queue(self.queue_size)
+        self._queues.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._queues[user_id]
+            queues.discard(queue)
+            if not queues:
+                del self._queues[user_id]
+
+    def _deliver(self, user_id: int, event: dict[str, Any]) -> None:
+        for queue in self._queues.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class RedisBroker(MemoryBroker):
+    """
+    Events published to a redis channel per user. Every process keeps one pattern subscription
+    for all users, started with its first websocket, and delivers to its own websockets.
+    Redis errors are logged: events are hints to refetch, a lost one costs a stale screen until the next.
+    """
+
+    def __init__(self, url: str, prefix: str, queue_size: int) -> None:
+        super().__init__(queue_size)
+        self.redis = aioredis.Redis.from_url(url)
+        self.prefix = f'{prefix}events:'
+        self._listener: asyncio.Task | None = None
+
+    async def publish(self, user_id: int, event: dict[str, Any]) -> None:
+        try:
+            await self.redis.publish(f'{self.prefix}{user_id}', orjson.dumps(event))
+        except RedisError as err:
+            logger.warning("publish of %s to user %s failed: %s", event.get('type'), user_id, err)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        async with super().subscribe(user_id) as queue:
+            yield queue
+
+    async def _listen(self) -> None:
+        while self._queues:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.psubscribe(f'{self.prefix}*')
+                    async for message in pubsub.listen():
+                        if message['type'] != 'pmessage':
+                            continue
+                        user_id = int(message['channel'][len(self.prefix):])
+                        self._deliver(user_id, orjson.loads(message['data']))
+            except RedisError as err:
+                logger.warning("event subscription lost, retrying in %ss: %s", RECONNECT_DELAY, err)
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+def create_broker() -> MemoryBroker | RedisBroker:
+    if settings.events.redis_url:
+        return RedisBroker(settings.events.redis_url, settings.events.prefix, settings.events.queue_size)
+    return MemoryBroker(settings.events.queue_size)
+
+
+broker = create_broker()
+
+
+async def publish(user_id: int, type: str, **data: Any) -> None:
+    """
+    Pushes {"type": type, **data} to the open websockets of user_id, call it after the commit
+    """
+    await broker.publish(user_id, {'type': type, **data})
@@ -0,0 +1,49 @@
+import asyncio
+import orjson
+from fastapi import APIRouter, Query, WebSocket, status
+from settings import settings
+from src.auth.manager import UserManager
+from .broker import broker
+
+router = APIRouter(prefix='/ws', tags=['events'])
+
+
+async def forward(websocket: WebSocket, queue: asyncio.Queue) -> None:
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), settings.events.ping_interval)
+        except asyncio.TimeoutError:
+            event = {'type': 'ping'}
+        await websocket.send_text(orjson.dumps(event).decode())
+
+
+async def drain(websocket: WebSocket) -> None:
+    """
+    Reads until the client disconnects, clients have nothing to send
+    """
+    while (await websocket.receive())['type'] != 'websocket.disconnect':
+        pass
+
+
+@router.websocket('/')
+async def events(websocket: WebSocket, token: str | None = Query(default=None)):
+    """
+    Pushes the events of the user as JSON text messages: {"type": "menu.generated", ...},
+    {"type": "goal.updated", ...}, {"type": "info.updated"} and {"type": "ping"} when idle.
+    The access token goes in ?token= (browsers can't set headers on a websocket) or in Authorization.
+    Events published while a client is disconnected are not replayed, it refetches after reconnecting.
+    """
+    if token is None:
+        _, _, token = websocket.headers.get('authorization', '').partition(' ')
+    user = await UserManager.get_session_user(token)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    async with broker.subscribe(user.id) as queue:
+        sender = asyncio.create_task(forward(websocket, queue))
+        try:
+            await drain(websocket)
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
@@ -0,0 +1,42 @@
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import ForeignKey, Index, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from src.database.models import BaseModel
+from src.database.types import str_64
+
+
+class JobStatus(Enum):
+    QUEUED = 'q'
+    RUNNING = 'r'
+    DONE = 'd'
+    FAILED = 'f'
+
+
+class JobModel(BaseModel):
+    """
+    - run_at : queued jobs run once it passed, retries move it forward by the backoff
+    - started_at : running jobs whose worker died are claimed again settings.jobs.timeout after it
+    - user_id : owner allowed to read the status, none for internal jobs
+    """
+    __tablename__ = 'jobs'
+
+    name: Mapped[str_64]
+    payload: Mapped[dict] = mapped_column(JSONB, default=dict)
+    status: Mapped[JobStatus] = mapped_column(default=JobStatus.QUEUED)
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int]
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('accounts.id', ondelete='CASCADE'), nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    run_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    started_at: Mapped[datetime] = mapped_column(nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    def __str__(self):
+        return f"<JobModel(name: {self.name}, status: {self.status})>"
@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings import settings
+from .models import JobModel, JobStatus
+
+
+class Job:
+    """
+    Handler registered with @job. Awaiting it runs the handler inline, enqueue() leaves it to a worker.
+    """
+
+    def __init__(self, handler: Callable[..., Awaitable[Any]], name: str, max_attempts: int) -> None:
+        self.handler = handler
+        self.name = name
+        self.max_attempts = max_attempts
+
+    async def __call__(self, session: AsyncSession, **payload) -> Any:
+        return await self.handler(session, **payload)
+
+    async def enqueue(self, session: AsyncSession, *, owner: int | None = None, delay: float = 0, **payload) -> JobModel:
+        """
+        Adds the job to the caller's transaction, workers see it once the caller commits
+        :param owner: user allowed to read the job status
+        :param delay: seconds before the first attempt
+        :param payload: json serializable keyword arguments of the handler
+        """
+        job = JobModel(
+            name=self.name,
+            payload=payload,
+            user_id=owner,
+            max_attempts=self.max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        session.add(job)
+        await session.flush()
+        return job
+
+
+jobs: dict[str, Job] = {}
+
+
+def job(name: str, max_attempts: int | None = None):
+    """
+    Registers an async handler(session, **payload) as a background job.
+    The handler commits its own work; raising makes the job retry with backoff.
+    """
+
+    def decorator(handler: Callable[..., Awaitable[Any]]) -> Job:
+        registered = Job(handler, name, max_attempts or settings.jobs.max_attempts)
+        jobs[name] = registered
+        return registered
+
+    return decorator
+
+
+def backoff(attempts: int) -> timedelta:
+    delay = min(settings.jobs.backoff * 2 ** (attempts - 1), settings.jobs.max_backoff)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+async def claim(session: AsyncSession) -> JobModel | None:
+    """
+    Marks the next due job as running and commits. Workers skip rows locked by each other.
+    Running jobs started more than timeout + reclaim_grace ago belong to a dead worker: they are due again,
+    or failed when they used up their attempts, so a job that kills its worker is not retried forever.
+    """
+    now = datetime.utcnow()
+    abandoned = and_(
+        JobModel.status == JobStatus.RUNNING,
+        JobModel.started_at < now - timedelta(seconds=settings.jobs.timeout + settings.jobs.reclaim_grace),
+    )
+    await session.execute(
+        update(JobModel)
+        .where(abandoned, JobModel.attempts >= JobModel.max_attempts)
+        .values(status=JobStatus.FAILED, finished_at=now, error='worker died while running the job')
+        .execution_options(synchronize_session=False)
+    )
+    due = (
+        select(JobModel.id)
+        .where(or_(
+            and_(JobModel.status == JobStatus.QUEUED, JobModel.run_at <= now),
+            and_(abandoned, JobModel.attempts < JobModel.max_attempts),
+        ))
+        .order_by(JobModel.run_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job = (await session.execute(
+        update(JobModel)
+        .where(JobModel.id == due)
+        .values(status=JobStatus.RUNNING, attempts=JobModel.attempts + 1, started_at=now)
+        .returning(JobModel)
+        .execution_options(synchronize_session=False)
+    )).scalar_one_or_none()
+    await session.commit()
+    return job
@@ -0,0 +1,15 @@
+from datetime import datetime
+from pydantic import BaseModel
+from .models import JobStatus
+
+
+class JobSchema(BaseModel):
+    id: int
+    name: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    error: str | None
+    created_at: datetime
+    run_at: datetime
+    finished_at: datetime | None
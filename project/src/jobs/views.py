@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Path, HTTPException, status
+from src.auth.manager import UserManager
+from src.auth.models import SessionModel
+from src.database.database import get_session, AsyncSession
+from .models import JobModel
+from .schemas import JobSchema
+
+router = APIRouter(prefix='/jobs', tags=['jobs'])
+
+
+@router.get('/{id}', response_model=JobSchema)
+async def get_job(
+        job_id: int = Path(alias='id'),
+        session: AsyncSession = Depends(get_session),
+        user_session: SessionModel = Depends(UserManager.get_current_user)
+):
+    job = await session.get(JobModel, job_id)
+    if job is None or (job.user_id != user_session.user_id and not user_session.user.is_admin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Job not found')
+    return JobSchema.model_validate(job, from_attributes=True)
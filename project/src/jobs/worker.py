@@ -0,0 +1,106 @@
+"""
+Runs queued jobs, start as many processes as needed next to uvicorn:
+
+    python -m src.jobs.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import importlib
+import logging
+import signal
+from contextlib import suppress
+from datetime import datetime
+from sqlalchemy import update, exc
+import src  # noqa: F401, registers every model
+from settings import settings
+from src.database.database import async_session_maker
+from .models import JobModel, JobStatus
+from .queue import jobs, claim, backoff
+
+logger = logging.getLogger(__name__)
+
+# modules whose @job handlers the worker runs
+TASK_MODULES = ['src.diet.tasks']
+
+
+async def execute(job: JobModel) -> None:
+    registered = jobs.get(job.name)
+    async with async_session_maker() as session:
+        try:
+            if registered is None:
+                raise LookupError(f"no handler for job {job.name}")
+            await asyncio.wait_for(registered(session, **job.payload), settings.jobs.timeout)
+        except Exception as err:
+            await session.rollback()
+            retry = registered is not None and job.attempts < job.max_attempts
+            logger.exception("job %s %s failed, attempt %d of %d", job.id, job.name, job.attempts, job.max_attempts)
+            values = {'status': JobStatus.QUEUED, 'run_at': datetime.utcnow() + backoff(job.attempts)} if retry \
+                else {'status': JobStatus.FAILED, 'finished_at': datetime.utcnow()}
+            values['error'] = f"{type(err).__name__}: {err}"
+        else:
+            values = {'status': JobStatus.DONE, 'finished_at': datetime.utcnow(), 'error': None}
+        await session.execute(update(JobModel).where(JobModel.id == job.id).values(**values))
+        await session.commit()
+
+
+class Worker:
+    """
+    Claims due jobs while it has free slots, waits poll_interval when there are none.
+    stop() lets the running jobs finish.
+    """
+
+    def __init__(self, concurrency: int) -> None:
+        self.slots = asyncio.Semaphore(concurrency)
+        self.stopping = asyncio.Event()
+        self.running: set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+    async def run(self) -> None:
+        while not self.stopping.is_set():
+            await self.slots.acquire()
+            try:
+                async with async_session_maker() as session:
+                    job = await claim(session)
+            except (OSError, exc.DBAPIError, exc.TimeoutError) as err:
+                logger.warning("claiming a job failed: %s", err)
+                job = None
+            if job is None:
+                self.slots.release()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.stopping.wait(), settings.jobs.poll_interval)
+                continue
+            task = asyncio.create_task(self._execute(job))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+        await asyncio.gather(*self.running)
+
+    async def _execute(self, job: JobModel) -> None:
+        try:
+            await execute(job)
+        finally:
+            self.slots.release()
+
+
+async def serve(concurrency: int) -> None:
+    worker = Worker(concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    logger.info("worker started, jobs: %s", ', '.join(sorted(jobs)))
+    await worker.run()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=settings.jobs.concurrency)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+    asyncio.run(serve(args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
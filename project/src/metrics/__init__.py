@@ -0,0 +1,2 @@
+from .metrics import mark_process_dead
+from .middleware import MetricsMiddleware
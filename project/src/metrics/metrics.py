@@ -0,0 +1,47 @@
+import os
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client import multiprocess
+
+# with PROMETHEUS_MULTIPROC_DIR set every worker writes its values to mmap files in it
+# and /metrics sums them, the directory is emptied by entrypoint.sh before the workers start
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1, 2.5, 5, 10)
+
+http_requests = Counter(
+    'http_requests', 'HTTP requests by route and status', ['method', 'route', 'status']
+)
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+http_requests_in_progress = Gauge(
+    'http_requests_in_progress', 'HTTP requests being handled', ['method'], multiprocess_mode='livesum'
+)
+
+db_pool_checkouts = Counter('db_pool_checkouts', 'Connections checked out of the pool', ['pool'])
+db_pool_checkout_duration = Histogram(
+    'db_pool_checkout_seconds', 'Time to get a connection: waiting, connecting, pre-ping', ['pool'],
+    buckets=(.0005, .001, .005, .01, .05, .1, .5, 1, 5, 30)
+)
+db_pool_timeouts = Counter('db_pool_timeouts', 'Checkouts that waited longer than pool_timeout', ['pool'])
+db_pool_connect_errors = Counter('db_pool_connect_errors', 'Checkouts that failed to connect', ['pool'])
+db_pool_checked_out = Gauge(
+    'db_pool_checked_out', 'Connections in use', ['pool'], multiprocess_mode='livesum'
+)
+
+cache_requests = Counter('cache_requests', 'Cache lookups by key namespace', ['namespace', 'result'])
+
+password_hash_queue = Gauge(
+    'password_hash_queue', 'bcrypt calls waiting for a thread', multiprocess_mode='livesum'
+)
+password_hash_duration = Histogram(
+    'password_hash_seconds', 'bcrypt calls from submit to result', buckets=(.05, .1, .25, .5, 1, 2.5, 5)
+)
+
+
+def mark_process_dead() -> None:
+    """
+    Drops the live gauges of this worker, called when it stops
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,38 @@
+import time
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from .metrics import http_requests, http_request_duration, http_requests_in_progress
+
+
+class MetricsMiddleware:
+    """
+    Counts every http request by route template and status and observes its latency.
+    Requests no route matched share the 'unmatched' route, so scanners can't add label values.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        method = scope['method']
+        in_progress = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = scope.get('route')
+            path = route.path if route else 'unmatched'
+            http_request_duration.labels(method, path).observe(time.perf_counter() - started)
+            http_requests.labels(method, path, status_code).inc()
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+from .metrics import MULTIPROCESS
+
+router = APIRouter(tags=['metrics'])
+
+
+@router.get('/metrics', include_in_schema=False)
+def metrics():
+    """
+    Prometheus text format, summed over all workers in multiprocess mode.
+    Sync on purpose: reading the files of every worker runs in the threadpool.
+    """
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
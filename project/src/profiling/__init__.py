@@ -0,0 +1,2 @@
+from .middleware import ProfilingMiddleware
+from .store import profiles
@@ -0,0 +1,79 @@
+import asyncio
+import random
+import time
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from settings import settings
+from src.auth.manager import UserManager
+from .sampler import StackSampler
+from .store import profiles
+
+
+class ProfilingMiddleware:
+    """
+    Samples the stacks of a share of the requests (sample_rate) and of the admin requests sent with
+    an X-Profile header, one at a time per worker. The id of the stored profile is returned in X-Profile-Id.
+    Only installed when profiling is enabled.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._busy = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or self._busy:
+            await self.app(scope, receive, send)
+            return
+        # taken before the admin lookup awaits, so requests arriving meanwhile are not sampled as well
+        self._busy = True
+        wanted = False
+        try:
+            wanted = await self._wanted(scope)
+        finally:
+            if not wanted:
+                self._busy = False
+        if not wanted:
+            await self.app(scope, receive, send)
+            return
+        profile_id = profiles.new_id()
+        status_code = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                MutableHeaders(scope=message)['X-Profile-Id'] = profile_id
+            await send(message)
+
+        sampler = StackSampler(asyncio.current_task(), settings.profiling.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - started
+            self._busy = False
+            route = scope.get('route')
+            await asyncio.to_thread(profiles.save, {
+                'id': profile_id,
+                'method': scope['method'],
+                'path': scope['path'],
+                'route': route.path if route else None,
+                'status': status_code,
+                'duration_ms': round(duration * 1000, 3),
+                'interval_ms': settings.profiling.interval * 1000,
+                'samples': sum(sampler.stacks.values()),
+                'stacks': dict(sampler.stacks),
+            })
+
+    @staticmethod
+    async def _wanted(scope: Scope) -> bool:
+        if settings.profiling.sample_rate and random.random() < settings.profiling.sample_rate:
+            return True
+        headers = Headers(scope=scope)
+        if 'x-profile' not in headers:
+            return False
+        _, _, token = headers.get('authorization', '').partition(' ')
+        user = await UserManager.get_session_user(token)
+        return user is not None and user.is_admin
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import sysconfig
+import threading
+from collections import Counter
+from types import FrameType
+from settings import settings
+
+STDLIB = sysconfig.get_path('stdlib')
+
+
+def frame_name(frame: FrameType) -> str:
+    filename = frame.f_code.co_filename
+    base = str(settings.base_dir)
+    if filename.startswith(base):
+        filename = filename[len(base) + 1:]
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages', 1)[1].lstrip('/\\')
+    elif filename.startswith(STDLIB):
+        filename = filename[len(STDLIB) + 1:]
+    return f'{filename}:{frame.f_code.co_qualname}'
+
+
+class StackSampler(threading.Thread):
+    """
+    Wall clock stacks of one asyncio task, sampled from a thread every `interval` seconds.
+    While the task runs the stack is the one of the event loop thread, while it is suspended it is
+    its chain of awaited coroutines down to the future it waits for, so time spent awaiting the database
+    is attributed to the awaiting code. Work the task hands to other threads or tasks is not seen.
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float) -> None:
+        super().__init__(name='profiler', daemon=True)
+        self.task = task
+        self.interval = interval
+        self.loop_thread = threading.get_ident()
+        self.stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            stack = self.sample()
+            if stack:
+                self.stacks[';'.join(stack)] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def sample(self) -> list[str]:
+        """
+        :return: frame names, outermost first
+        """
+        coro = self.task.get_coro()
+        if getattr(coro, 'cr_running', False):
+            return self._running(coro.cr_frame)
+        return self._awaiting(coro)
+
+    def _running(self, top: FrameType) -> list[str]:
+        """
+        :return: empty when top is not on the loop thread's stack: the task yielded after the cr_running
+            check and the stack is the one of another task
+        """
+        frame = sys._current_frames().get(self.loop_thread)
+        stack = []
+        while frame is not None:
+            stack.append(frame_name(frame))
+            if frame is top:
+                return stack[::-1]
+            frame = frame.f_back
+        return []
+
+    @staticmethod
+    def _awaiting(awaitable) -> list[str]:
+        stack = []
+        while awaitable is not None:
+            frame = getattr(awaitable, 'cr_frame', None) or getattr(awaitable, 'ag_frame', None) \
+                or getattr(awaitable, 'gi_frame', None)
+            if frame is None:
+                stack.append(f'<await {type(awaitable).__name__}>')
+                break
+            stack.append(frame_name(frame))
+            awaitable = getattr(awaitable, 'cr_await', None) or getattr(awaitable, 'ag_await', None) \
+                or getattr(awaitable, 'gi_yieldfrom', None)
+        return stack
@@ -0,0 +1,65 @@
+import json
+import pathlib
+import re
+import time
+import uuid
+from settings import settings
+
+PROFILE_ID = re.compile(r'^\d+-[0-9a-f]{8}$')
+
+
+class ProfileStore:
+    """
+    Profiles as JSON files in a directory, a ring of the newest max_profiles.
+    Blocking file io, called through a thread.
+    """
+
+    def __init__(self, directory: pathlib.Path, max_profiles: int) -> None:
+        if max_profiles < 1:
+            raise ValueError(f"max_profiles must be at least 1, got {max_profiles}")
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    @staticmethod
+    def new_id() -> str:
+        # sorts by time
+        return f'{time.time_ns() // 1_000_000}-{uuid.uuid4().hex[:8]}'
+
+    def save(self, profile: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{profile['id']}.json"
+        path.with_suffix('.tmp').write_text(json.dumps(profile))
+        path.with_suffix('.tmp').replace(path)
+        for old in self._paths()[:-self.max_profiles]:
+            old.unlink(missing_ok=True)
+
+    def all(self) -> list[dict]:
+        """
+        :return: profiles without their stacks, newest first
+        """
+        profiles = []
+        for path in reversed(self._paths()):
+            try:
+                profile = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # deleted by the ring or being replaced
+                continue
+            profile.pop('stacks')
+            profiles.append(profile)
+        return profiles
+
+    def get(self, profile_id: str) -> dict | None:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            return json.loads((self.directory / f'{profile_id}.json').read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _paths(self) -> list[pathlib.Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob('*.json'))
+
+
+profiles = ProfileStore(settings.profiling.directory, settings.profiling.max_profiles)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, status
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from src.auth.manager import get_current_admin
+from .store import profiles
+
+router = APIRouter(prefix='/profiling', tags=['profiling'])
+
+
+@router.get('/')
+async def list_profiles(_=Depends(get_current_admin)):
+    """
+    Stored profiles, newest first
+    """
+    return await run_in_threadpool(profiles.all)
+
+
+@router.get('/{id}', response_class=PlainTextResponse)
+async def get_profile(profile_id: str = Path(alias='id'), _=Depends(get_current_admin)):
+    """
+    Folded stacks ("frame;frame;frame samples" per line) for flamegraph.pl or speedscope
+    """
+    profile = await run_in_threadpool(profiles.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Profile not found')
+    folded = '\n'.join(f'{stack} {count}' for stack, count in sorted(profile['stacks'].items()))
+    return PlainTextResponse(
+        folded + '\n', headers={'Content-Disposition': f'attachment; filename="{profile_id}.folded"'}
+    )
@@ -0,0 +1,40 @@
+import functools
+from typing import Any, Mapping
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+
+@functools.cache
+def type_adapter(schema: Any) -> TypeAdapter:
+    """
+    Adapters build their validator and serializer once, schemas like list[ProductSchema] are cached by value
+    """
+    return TypeAdapter(schema)
+
+
+def dump_json(schema: Any, content: Any) -> bytes:
+    """
+    Validates ORM rows from their attributes (instances of the schema pass as they are)
+    and serializes them in pydantic-core, without the dict round trip of response_model.
+    """
+    adapter = type_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+class SchemaResponse(Response):
+    """
+    JSON body of content serialized against schema. FastAPI does not validate a returned Response again,
+    keep response_model on the route for the docs.
+    """
+    media_type = 'application/json'
+
+    def __init__(
+            self,
+            schema: Any,
+            content: Any,
+            status_code: int = 200,
+            headers: Mapping[str, str] | None = None,
+            background: BackgroundTask | None = None
+    ) -> None:
+        super().__init__(dump_json(schema, content), status_code, headers, background=background)
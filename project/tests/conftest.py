@@ -0,0 +1,27 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy import exc, text
+
+# lazy loads that need sql fail the tests instead of being logged
+os.environ.setdefault('DATABASE_STRICT_LOADING', 'raise')
+
+
+@pytest.fixture(scope='session')
+def database() -> None:
+    """
+    Skips the test when the configured postgres is not reachable
+    """
+    from src.database.database import async_engine
+
+    async def ping() -> None:
+        try:
+            async with async_engine.connect() as connection:
+                await connection.execute(text('SELECT 1'))
+        finally:
+            await async_engine.dispose()
+
+    try:
+        asyncio.run(ping())
+    except (OSError, exc.DBAPIError) as err:
+        pytest.skip(f'postgres is not reachable: {err}')
@@ -0,0 +1,66 @@
+import asyncio
+from src.cache import Cache, MemoryBackend
+from src.cache.backends import MISSING
+
+
+def test_least_recently_used_is_evicted():
+    async def run():
+        backend = MemoryBackend(max_entries=2)
+        await backend.set('a', 1, 60, ())
+        await backend.set('b', 2, 60, ())
+        await backend.get('a')
+        await backend.set('c', 3, 60, ())
+        return [await backend.get(key) for key in 'abc']
+
+    assert asyncio.run(run()) == [1, MISSING, 3]
+
+
+def test_values_without_ttl_are_not_evicted():
+    async def run():
+        backend = MemoryBackend(max_entries=1)
+        await backend.set('catalog:version', 'v1', None, ())
+        for key in 'abc':
+            await backend.set(key, key, 60, ())
+        return await backend.get('catalog:version'), await backend.get('b'), await backend.get('c')
+
+    assert asyncio.run(run()) == ('v1', MISSING, 'c')
+
+
+def test_expired_value_is_a_miss():
+    async def run():
+        backend = MemoryBackend(max_entries=10)
+        await backend.set('a', 1, 0.01, ())
+        await asyncio.sleep(0.02)
+        return await backend.get('a')
+
+    assert asyncio.run(run()) is MISSING
+
+
+def test_invalidate_tags():
+    async def run():
+        cache = Cache(MemoryBackend(max_entries=10), lock_timeout=1)
+        await cache.set('a', 1, tags=['products'])
+        await cache.set('b', 2, tags=['products', 'menus:1'])
+        await cache.set('c', 3, tags=['menus:1'])
+        await cache.set('d', 4)
+        await cache.invalidate_tags('products')
+        return [await cache.get(key) for key in 'abcd']
+
+    assert asyncio.run(run()) == [None, None, 3, 4]
+
+
+def test_get_or_set_builds_a_missing_value_once():
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 'value'
+
+    async def run():
+        cache = Cache(MemoryBackend(max_entries=10), lock_timeout=1)
+        return await asyncio.gather(*(cache.get_or_set('key', factory) for _ in range(20)))
+
+    assert asyncio.run(run()) == ['value'] * 20
+    assert calls == 1
@@ -0,0 +1,6 @@
+import asyncio
+from benchmarks.explain_plans import LARGE_TABLE_ROWS, check
+
+
+def test_hot_queries_do_not_scan_large_tables(database):
+    assert asyncio.run(check(users=2000, days=14, products=2 * LARGE_TABLE_ROWS)) == 0
@@ -0,0 +1,21 @@
+from starlette.requests import Request
+from src.database.database import RecentWrites
+
+
+def request(authorization: str | None, cookie: str | None) -> Request:
+    headers = []
+    if authorization is not None:
+        headers.append((b'authorization', authorization.encode()))
+    if cookie is not None:
+        headers.append((b'cookie', cookie.encode()))
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers})
+
+
+def test_marker_belongs_to_the_client():
+    writes = RecentWrites(window=5)
+    cookie = writes.set_cookie(writes.marker('Bearer a')).partition(';')[0]
+    assert 'Max-Age=5' in writes.set_cookie('x')
+    assert writes.contains(request('Bearer a', cookie))
+    assert not writes.contains(request('Bearer b', cookie))
+    assert not writes.contains(request('Bearer a', None))
+    assert not writes.contains(request(None, cookie))
@@ -0,0 +1,5 @@
+from benchmarks.startup import deferred_imports
+
+
+def test_main_does_not_import_deferred_modules():
+    assert deferred_imports() == []
@@ -0,0 +1,59 @@
+import math
+import random
+import statistics
+import pytest
+from src.diet.catalog import TypeProducts
+from src.diet.models import ProductTypes
+from src.diet.substitution import OVERLAP_WEIGHT, WINDOW, SubstitutionIndex
+
+
+def catalog(rows: list[tuple[int, int, frozenset[int]]]) -> dict[ProductTypes, TypeProducts]:
+    products = {product_type: TypeProducts() for product_type in ProductTypes}
+    of_type = products[ProductTypes.MEAT]
+    for product_id, (calories, price, ingredients) in enumerate(rows, start=1):
+        of_type.ids.append(product_id)
+        of_type.names.append(f'product {product_id}')
+        of_type.calories.append(calories)
+        of_type.prices.append(price)
+        of_type.ingredients.append(ingredients)
+    return products
+
+
+def brute_force(of_type: TypeProducts, i: int, exclude: set[int]) -> list[tuple[int, float]]:
+    calories_scale = statistics.pstdev(of_type.calories) or 1
+    prices_scale = statistics.pstdev(of_type.prices) or 1
+    result = []
+    for j in range(len(of_type.ids)):
+        if j == i or of_type.ids[j] in exclude:
+            continue
+        distance = math.hypot((of_type.calories[j] - of_type.calories[i]) / calories_scale,
+                              (of_type.prices[j] - of_type.prices[i]) / prices_scale)
+        union = len(of_type.ingredients[i] | of_type.ingredients[j])
+        overlap = len(of_type.ingredients[i] & of_type.ingredients[j]) / union if union else 1.0
+        result.append((j, distance + OVERLAP_WEIGHT * (1 - overlap)))
+    return sorted(result, key=lambda item: item[1])
+
+
+def test_nearest_outside_the_calories_window():
+    # the calorie neighbours cost a lot more, the closest product by price sits past WINDOW of them
+    rows = [(100, 100, frozenset())]
+    rows += [(101 + n, 10_000, frozenset()) for n in range(2 * WINDOW)]
+    rows += [(101 + 2 * WINDOW, 100, frozenset())]
+    index = SubstitutionIndex(catalog(rows))
+    position, _ = index.nearest(1, limit=1)[0]
+    assert position == len(rows) - 1
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_nearest_matches_brute_force(seed):
+    rnd = random.Random(seed)
+    rows = [(rnd.randrange(50, 900), rnd.randrange(50, 2000), frozenset(rnd.sample(range(12), 3)))
+            for _ in range(400)]
+    products = catalog(rows)
+    index = SubstitutionIndex(products)
+    for product_id in rnd.sample(range(1, len(rows) + 1), 20):
+        exclude = set(rnd.sample(range(1, len(rows) + 1), 10))
+        nearest = index.nearest(product_id, limit=5, exclude=exclude)
+        expected = brute_force(products[ProductTypes.MEAT], product_id - 1, exclude)[:5]
+        assert [distance for _, distance in nearest] == pytest.approx([distance for _, distance in expected])
+        assert not {products[ProductTypes.MEAT].ids[j] for j, _ in nearest} & exclude
@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+import uuid
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.auth.models import AccountModel
+from src.database.database import async_engine
+from src.database.uow import UnitOfWork
+from src.diet.models import MenuModel, MenuItemModel, MealTimes, ProductModel, ProductTypes
+
+
+def test_flush_maps_generated_ids_to_staged_rows(database):
+    async def run():
+        async with async_engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                session = AsyncSession(connection, join_transaction_mode='create_savepoint', expire_on_commit=False)
+                uow = UnitOfWork(session)
+                prefix = uuid.uuid4().hex[:8]
+                user = uow.add(AccountModel, username=f'uow{prefix}', password='x',
+                               birth_date=datetime.date(1990, 1, 1), gender=True, is_admin=False)
+                products = uow.add_all(ProductModel, [
+                    {'name': f'uow{prefix}{i}', 'image': f'uow/{prefix}/{i}', 'type': ProductTypes.MEAT, 'calories': i}
+                    for i in range(5)
+                ])
+                menus = uow.add_all(MenuModel, [
+                    {'user_id': user, 'date': datetime.date(2030, 1, 1 + day), 'meal_time': MealTimes.LUNCH}
+                    for day in range(3)
+                ])
+                # children listed out of parent order
+                items = uow.add_all(MenuItemModel, [
+                    {'menu_id': menus[i % 3], 'product_id': products[(i * 2) % 5]} for i in range(7, -1, -1)
+                ])
+                await uow.flush()
+
+                stored = dict((await session.execute(
+                    select(MenuModel.id, MenuModel.date).where(MenuModel.user_id == user.id)
+                )).all())
+                assert {menu.id: menu.date for menu in menus} == stored
+                names = dict((await session.execute(
+                    select(ProductModel.id, ProductModel.name).where(ProductModel.id.in_([p.id for p in products]))
+                )).all())
+                assert [names[product.id] for product in products] == [f'uow{prefix}{i}' for i in range(5)]
+                rows = (await session.execute(
+                    select(MenuItemModel.id, MenuItemModel.menu_id, MenuItemModel.product_id)
+                    .where(MenuItemModel.id.in_([item.id for item in items]))
+                )).all()
+                assert {(item.id, item.menu_id, item.product_id) for item in items} == set(rows)
+                assert [item.menu_id for item in items] == [menus[i % 3].id for i in range(7, -1, -1)]
+
+                menu = uow.load(menus[0])
+                assert isinstance(menu, MenuModel)
+                assert menu in session and not session.dirty and not session.new
+                assert await session.get(MenuModel, menus[0].id) is menu
+                assert (menu.user_id, menu.date, menu.meal_time) == (user.id, datetime.date(2030, 1, 1), MealTimes.LUNCH)
+                await session.close()
+            finally:
+                await transaction.rollback()
+        await async_engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+import pytest
+from fastapi import HTTPException
+from src.diet.video import parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=900-', (900, 999)),
+    ('bytes=990-2000', (990, 999)),
+    ('bytes=-100', (900, 999)),
+    ('bytes=-5000', (0, 999)),
+    # multipart and malformed ranges are ignored, the whole file is sent
+    ('bytes=0-1,5-9', None),
+    ('items=0-9', None),
+    ('bytes=a-b', None),
+    ('bytes=--5', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=5000-6000', 'bytes=10-5', 'bytes=-0'])
+def test_unsatisfiable_range(header):
+    with pytest.raises(HTTPException) as err:
+        parse_range(header, SIZE)
+    assert err.value.status_code == 416
+    assert err.value.headers == {'Content-Range': f'bytes */{SIZE}'}